@@ -5,21 +5,30 @@ This module provides the main FastAPI application for the Enterprise Architectur
 """
 
 import os
+import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Security, status
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import APIKeyHeader
+from brotli_asgi import BrotliMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
+import asyncpg
+import orjson
+from anyio import to_thread
 from dotenv import load_dotenv
 from supabase import create_client
 
+from middleware import APIKeyMiddleware
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (application logs only; uvicorn's per-request access log is disabled)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # Initialize Supabase client
@@ -31,49 +40,116 @@ if not supabase_url or not supabase_key:
 
 supabase = create_client(supabase_url, supabase_key)
 
+# Direct Postgres connection for read-heavy GenAI queries
+supabase_db_url = os.getenv("SUPABASE_DB_URL")
+
+if not supabase_db_url:
+    raise EnvironmentError("Supabase database URL must be set in environment variables")
+
 # API security
-API_KEY_NAME = "X-API-Key"
-api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
+expected_api_key = os.getenv("API_KEY")
+
+if not expected_api_key:
+    raise EnvironmentError("API key must be set in environment variables")
 
 # Create FastAPI app
 app = FastAPI(
     title="Enterprise Architecture Solution API",
     description="API for Enterprise Architecture Solution built on Essential Cloud",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Share the Supabase client with routers
+app.state.supabase = supabase
+
+@app.on_event("startup")
+async def configure_threadpools():
+    # Blocking OpenAI/Supabase calls run in worker threads: AnyIO's pool serves sync
+    # endpoints and streamed iterators, the loop's default executor serves
+    # asyncio.to_thread. Both default to a few dozen threads.
+    threadpool_size = int(os.getenv("THREADPOOL_SIZE", "200"))
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_size
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=threadpool_size, thread_name_prefix="ea-worker")
+    )
+
+async def _init_pg_connection(conn):
+    # Decode JSONB columns (element and model properties) into Python objects
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+@app.on_event("startup")
+async def open_pg_pool():
+    # Small pool per worker on top of Supavisor's transaction-mode pooler (port 6543).
+    # Server-side prepared statements don't survive transaction pooling, so the
+    # statement cache is disabled.
+    app.state.pg = await asyncpg.create_pool(
+        dsn=supabase_db_url,
+        min_size=int(os.getenv("PG_POOL_MIN_SIZE", "1")),
+        max_size=int(os.getenv("PG_POOL_MAX_SIZE", "3")),
+        max_inactive_connection_lifetime=1800,
+        statement_cache_size=0,
+        init=_init_pg_connection,
+    )
+    
+    # Fail startup rather than serve traffic without a working database
+    await app.state.pg.fetchval("SELECT 1")
+
+@app.on_event("shutdown")
+async def close_pg_pool():
+    await app.state.pg.close()
+
+# API key check (registered first so CORS and compression wrap it)
+app.add_middleware(APIKeyMiddleware, expected=expected_api_key.encode())
+
 # CORS middleware configuration
+# Explicit lists let Starlette answer preflights from a precomputed header set
+# instead of reflecting request headers, and max_age lets browsers cache them.
+cors_origins = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual origins
+    allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
+    allow_headers=["authorization", "content-type", "x-api-key"],
+    max_age=86400,
 )
 
-# Security dependency
-async def get_api_key(api_key: str = Security(api_key_header)):
-    if not api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="API key is missing",
-        )
-    
-    # In production, validate the API key against stored keys
-    # This is a simplified example
-    expected_api_key = os.getenv("API_KEY")
-    if api_key != expected_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid API key",
-        )
-    
-    return api_key
+# Response compression for large documentation and analysis payloads.
+# Brotli when the client accepts it, gzip otherwise; small bodies (including
+# API key rejections) are sent uncompressed.
+app.add_middleware(
+    BrotliMiddleware,
+    quality=4,
+    minimum_size=1024,
+    gzip_fallback=True,
+)
 
-# Health check endpoint
-@app.get("/health")
+# Health check endpoint (body is static, so serialize it once)
+_HEALTH_BYTES = orjson.dumps({"status": "healthy", "version": app.version})
+
+@app.get("/health", response_class=Response)
 async def health_check():
-    return {"status": "healthy", "version": app.version}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
+
+# Readiness endpoint (checks the database pool)
+@app.get("/ready")
+async def readiness_check():
+    try:
+        await app.state.pg.fetchval("SELECT 1")
+    except Exception as e:
+        logger.error(f"Readiness check failed: {str(e)}")
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable"},
+        )
+    
+    return {"status": "ready"}
 
 # Import routers
 from routers import models, elements, integrations, genai
@@ -94,5 +170,19 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     
-    # Run the server
-    uvicorn.run("app:app", host=host, port=port, reload=True)
+    # Autoreload is for local development only; it bypasses uvloop's fast startup path
+    reload = os.getenv("ENV") != "prod"
+    
+    # Run the server on uvloop with the httptools C parser
+    uvicorn.run(
+        "app:app",
+        host=host,
+        port=port,
+        reload=reload,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        proxy_headers=False,
+        server_header=False,
+        date_header=False,
+    )
@@ -0,0 +1,21 @@
+-- Atomic element updates for the GenAI element tool
+
+-- Merge a JSONB patch into an element's properties (and optionally set its name and
+-- description) in a single statement, avoiding a read-modify-write round-trip
+CREATE OR REPLACE FUNCTION public.merge_ea_element_props(
+    element_id UUID,
+    patch JSONB,
+    new_name TEXT DEFAULT NULL,
+    new_description TEXT DEFAULT NULL
+)
+RETURNS SETOF public.ea_elements
+LANGUAGE sql
+AS $$
+    UPDATE public.ea_elements
+    SET properties = properties || patch,
+        name = COALESCE(new_name, name),
+        description = COALESCE(new_description, description),
+        updated_at = now()
+    WHERE id = element_id
+    RETURNING *;
+$$;
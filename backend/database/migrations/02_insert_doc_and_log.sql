@@ -0,0 +1,23 @@
+-- Documentation saves for the GenAI documentation tool
+
+-- Insert a generated document and its ai_activity_logs entry in one transaction,
+-- returning the document ID
+CREATE OR REPLACE FUNCTION public.insert_doc_and_log(doc JSONB, log JSONB)
+RETURNS UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    doc_id UUID;
+BEGIN
+    INSERT INTO public.ea_documentation (artifact_type, artifact_id, format, audience, content, created_at)
+    SELECT artifact_type, artifact_id, format, audience, content, created_at
+    FROM jsonb_populate_record(NULL::public.ea_documentation, doc)
+    RETURNING id INTO doc_id;
+    
+    INSERT INTO public.ai_activity_logs (activity_type, artifact_type, artifact_id, content_length, created_at)
+    SELECT activity_type, artifact_type, artifact_id, content_length, created_at
+    FROM jsonb_populate_record(NULL::public.ai_activity_logs, log);
+    
+    RETURN doc_id;
+END;
+$$;
@@ -0,0 +1,31 @@
+-- Relationship lookups by endpoint for the GenAI tools
+
+-- Index each endpoint so lookups by source or target element avoid sequential scans
+CREATE INDEX IF NOT EXISTS ea_relationships_source_element_id_idx
+    ON public.ea_relationships (source_element_id);
+
+CREATE INDEX IF NOT EXISTS ea_relationships_target_element_id_idx
+    ON public.ea_relationships (target_element_id);
+
+-- Relationships touching any of the given elements. Each branch of the UNION ALL
+-- uses one of the indexes above; the second skips rows already returned by the first.
+CREATE OR REPLACE FUNCTION public.get_element_relationships(element_ids UUID[])
+RETURNS TABLE (
+    id UUID,
+    source_element_id UUID,
+    target_element_id UUID,
+    relationship_type_id UUID,
+    name TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT r.id, r.source_element_id, r.target_element_id, r.relationship_type_id, r.name
+    FROM public.ea_relationships r
+    WHERE r.source_element_id = ANY(element_ids)
+    UNION ALL
+    SELECT r.id, r.source_element_id, r.target_element_id, r.relationship_type_id, r.name
+    FROM public.ea_relationships r
+    WHERE r.target_element_id = ANY(element_ids)
+      AND NOT (r.source_element_id = ANY(element_ids));
+$$;
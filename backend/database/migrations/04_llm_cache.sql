@@ -0,0 +1,42 @@
+-- Semantic cache for GenAI tool completions
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- One row per cached completion, keyed by the hash of its canonical prompt context
+CREATE TABLE IF NOT EXISTS public.ea_llm_cache (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    embedding vector(1536) NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+);
+
+-- Only the service role reads and writes the cache
+ALTER TABLE public.ea_llm_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS ea_llm_cache_embedding_idx
+    ON public.ea_llm_cache USING hnsw (embedding vector_cosine_ops);
+
+-- Closest fresh cached completion in a namespace within the given cosine distance
+CREATE OR REPLACE FUNCTION public.match_llm_cache(
+    cache_namespace TEXT,
+    query_embedding vector(1536),
+    max_distance FLOAT,
+    max_age INTERVAL
+)
+RETURNS TABLE (
+    key TEXT,
+    response TEXT,
+    distance FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.key, c.response, c.embedding <=> query_embedding AS distance
+    FROM public.ea_llm_cache c
+    WHERE c.namespace = cache_namespace
+      AND c.created_at > now() - max_age
+      AND c.embedding <=> query_embedding < max_distance
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT 1;
+$$;
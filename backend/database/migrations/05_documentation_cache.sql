@@ -0,0 +1,22 @@
+-- Persistent store of generated documentation
+
+-- One row per artifact and prompt fingerprint. The fingerprint hashes the full
+-- documentation prompt (artifact data, style, format and model), so any change
+-- to the artifact or its relationships produces a new key.
+CREATE TABLE IF NOT EXISTS public.ai_documentation_cache (
+    content_id UUID NOT NULL,
+    fingerprint TEXT NOT NULL,
+    content_type TEXT NOT NULL CHECK (content_type IN ('element', 'model', 'view', 'policy')),
+    format TEXT NOT NULL,
+    style TEXT NOT NULL,
+    documentation TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    PRIMARY KEY (content_id, fingerprint)
+);
+
+-- Only the service role reads and writes the store
+ALTER TABLE public.ai_documentation_cache ENABLE ROW LEVEL SECURITY;
+
+-- Superseded versions are removed per artifact, style and format
+CREATE INDEX IF NOT EXISTS ai_documentation_cache_content_idx
+    ON public.ai_documentation_cache (content_id, style, format);
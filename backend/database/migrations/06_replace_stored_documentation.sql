@@ -0,0 +1,35 @@
+-- Atomic replacement of stored documentation
+
+-- Store documentation for an artifact, style and format and remove the versions
+-- it supersedes in one transaction. Concurrent replacements for the same
+-- artifact, style and format are serialized, so one of them always survives.
+CREATE OR REPLACE FUNCTION public.replace_stored_documentation(
+    doc_content_id UUID,
+    doc_fingerprint TEXT,
+    doc_content_type TEXT,
+    doc_format TEXT,
+    doc_style TEXT,
+    doc_documentation TEXT
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(doc_content_id::TEXT || ':' || doc_style || ':' || doc_format));
+    
+    DELETE FROM public.ai_documentation_cache
+    WHERE content_id = doc_content_id
+      AND style = doc_style
+      AND format = doc_format
+      AND fingerprint <> doc_fingerprint;
+    
+    INSERT INTO public.ai_documentation_cache (content_id, fingerprint, content_type, format, style, documentation)
+    VALUES (doc_content_id, doc_fingerprint, doc_content_type, doc_format, doc_style, doc_documentation)
+    ON CONFLICT (content_id, fingerprint) DO UPDATE
+    SET documentation = EXCLUDED.documentation,
+        created_at = now();
+END;
+$$;
+
+-- Only element prompts carry the artifact's data, so nothing else is stored
+DELETE FROM public.ai_documentation_cache WHERE content_type <> 'element';
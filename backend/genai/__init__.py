@@ -4,36 +4,74 @@ Enterprise Architecture Solution - GenAI Package
 This package provides AI-powered features for the Enterprise Architecture Solution.
 """
 
+import importlib
 import logging
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, Optional
 
-from .agents import initialize_ea_assistant
-from .documentation_generator import DocumentationGenerator
-from .impact_analysis import ImpactAnalysis
-from .pattern_recognition import PatternRecognition
+from anyio import to_thread
+
+from .cache import (
+    documentation_cache,
+    hash_text,
+    impact_analysis_cache,
+    pattern_recognition_cache,
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Submodules pull in the OpenAI SDK, so they are imported on first use rather than
+# when the package is imported (e.g. by routers that only need the cache).
+_LAZY_ATTRIBUTES = {
+    "initialize_ea_assistant": ".agents",
+    "DocumentationGenerator": ".documentation_generator",
+    "ImpactAnalysis": ".impact_analysis",
+    "PatternRecognition": ".pattern_recognition",
+}
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 class GenAIService:
-    """Service for accessing all GenAI features."""
+    """Service for accessing all GenAI features.
+    
+    The public methods are coroutines. Repository reads for documentation, impact
+    analysis and pattern recognition go through the asyncpg pool; remaining
+    blocking OpenAI and Supabase calls run in worker threads to keep the event
+    loop free.
+    """
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, pg_pool):
         """Initialize the GenAI service.
         
         Args:
             supabase_client: A configured Supabase client for database operations
+            pg_pool: Shared asyncpg pool for read-heavy repository queries
         """
+        from openai.agents import run
+        
+        from .agents import initialize_ea_assistant
+        from .documentation_generator import DocumentationGenerator
+        from .impact_analysis import ImpactAnalysis
+        from .pattern_recognition import PatternRecognition
+        
         self.supabase = supabase_client
-        self.documentation_generator = DocumentationGenerator(supabase_client)
-        self.impact_analysis = ImpactAnalysis(supabase_client)
-        self.pattern_recognition = PatternRecognition(supabase_client)
-        self.ea_assistant = initialize_ea_assistant(supabase_client)
+        self.pg_pool = pg_pool
+        self.documentation_generator = DocumentationGenerator(supabase_client, pg_pool)
+        self.impact_analysis = ImpactAnalysis(supabase_client, pg_pool)
+        self.pattern_recognition = PatternRecognition(supabase_client, pg_pool)
+        self.ea_assistant = initialize_ea_assistant(supabase_client, pg_pool)
+        self._run_agent = run
         
-    def generate_documentation(self, content_type: str, content_id: str, 
+    async def generate_documentation(self, content_type: str, content_id: str, 
                               format: str = "markdown", include_diagrams: bool = True,
-                              include_relationships: bool = True, 
+                              include_relationships: Optional[bool] = None, 
                               style: str = "technical") -> Dict[str, Any]:
         """Generate documentation for EA artifacts.
         
@@ -42,17 +80,51 @@ class GenAIService:
             content_id: UUID of the content
             format: Output format (markdown, html, docx)
             include_diagrams: Whether to include diagrams
-            include_relationships: Whether to include relationships
+            include_relationships: Whether to include relationships; defaults to
+                False for the executive style and True otherwise
+            style: Style of documentation (technical, business, executive)
+            
+        Returns:
+            Dict containing the generated documentation and metadata. Results are
+            cached for a few minutes; cache_status reports HIT or MISS.
+        """
+        key = (content_type, content_id, format, include_diagrams, include_relationships, style)
+        cached = documentation_cache.get(key)
+        if cached is not None:
+            return {**cached, "cache_status": "HIT"}
+        
+        # Identical concurrent misses share one generation inside the generator
+        result = await self.documentation_generator.generate_documentation(
+            content_type, content_id, format, include_diagrams, include_relationships, style
+        )
+        
+        if result.get("success"):
+            documentation_cache.set(key, result, tags=[content_id])
+        return {**result, "cache_status": "MISS"}
+        
+    async def stream_documentation(self, content_type: str, content_id: str, 
+                                   format: str = "markdown", include_diagrams: bool = True,
+                                   include_relationships: Optional[bool] = None, 
+                                   style: str = "technical") -> AsyncIterator[str]:
+        """Stream documentation for EA artifacts as it is generated.
+        
+        Args:
+            content_type: Type of content (element, model, view, policy)
+            content_id: UUID of the content
+            format: Output format (markdown, html)
+            include_diagrams: Whether to include diagrams
+            include_relationships: Whether to include relationships; defaults to
+                False for the executive style and True otherwise
             style: Style of documentation (technical, business, executive)
             
         Returns:
-            Dict containing the generated documentation and metadata
+            Async iterator over chunks of documentation text
         """
-        return self.documentation_generator.generate_documentation(
+        return await self.documentation_generator.stream_documentation(
             content_type, content_id, format, include_diagrams, include_relationships, style
         )
         
-    def analyze_impact(self, element_id: str, change_description: str, 
+    async def analyze_impact(self, element_id: str, change_description: str, 
                      change_type: str, analysis_depth: int = 2) -> Dict[str, Any]:
         """Analyze the impact of a proposed change to an architecture element.
         
@@ -63,13 +135,23 @@ class GenAIService:
             analysis_depth: Depth of impact analysis (1=direct, 2=indirect, 3=comprehensive)
             
         Returns:
-            Dict containing the impact analysis results
+            Dict containing the impact analysis results. Results are cached
+            briefly; cache_status reports HIT or MISS.
         """
-        return self.impact_analysis.analyze_impact(
+        key = (element_id, hash_text(change_description), change_type, analysis_depth)
+        cached = impact_analysis_cache.get(key)
+        if cached is not None:
+            return {**cached, "cache_status": "HIT"}
+        
+        result = await self.impact_analysis.analyze_impact(
             element_id, change_description, change_type, analysis_depth
         )
         
-    def recognize_patterns(self, model_id: str, element_ids: Optional[list] = None,
+        if result.get("success"):
+            impact_analysis_cache.set(key, result, tags=[element_id])
+        return {**result, "cache_status": "MISS"}
+        
+    async def recognize_patterns(self, model_id: str, element_ids: Optional[list] = None,
                          domain_filter: Optional[str] = None, 
                          pattern_types: Optional[list] = None) -> Dict[str, Any]:
         """Recognize patterns in architecture elements.
@@ -81,13 +163,28 @@ class GenAIService:
             pattern_types: Optional list of pattern types to look for
             
         Returns:
-            Dict containing the recognized patterns
+            Dict containing the recognized patterns. Results are cached
+            briefly; cache_status reports HIT or MISS.
         """
-        return self.pattern_recognition.recognize_patterns(
+        key = (
+            model_id,
+            tuple(sorted(element_ids)) if element_ids else None,
+            domain_filter,
+            tuple(sorted(pattern_types)) if pattern_types else None,
+        )
+        cached = pattern_recognition_cache.get(key)
+        if cached is not None:
+            return {**cached, "cache_status": "HIT"}
+        
+        result = await self.pattern_recognition.recognize_patterns(
             model_id, element_ids, domain_filter, pattern_types
         )
         
-    def run_assistant(self, messages: list) -> Dict[str, Any]:
+        if result.get("success"):
+            pattern_recognition_cache.set(key, result, tags=[model_id, *(element_ids or [])])
+        return {**result, "cache_status": "MISS"}
+        
+    async def run_assistant(self, messages: list) -> Dict[str, Any]:
         """Run the EA Assistant with the given conversation.
         
         Args:
@@ -96,10 +193,9 @@ class GenAIService:
         Returns:
             Dict containing the assistant's response
         """
-        from openai.agents import run
-        
         try:
-            result = run(self.ea_assistant, messages)
+            # AnyIO worker thread, so the agent's tools can query the asyncpg pool
+            result = await to_thread.run_sync(self._run_agent, self.ea_assistant, messages)
             return {
                 "success": True,
                 "result": result
@@ -110,3 +206,19 @@ class GenAIService:
                 "success": False,
                 "error": str(e)
             }
+
+
+@lru_cache(maxsize=1)
+def get_genai_service(supabase_client, pg_pool) -> GenAIService:
+    """Get the shared GenAI service for the application's database clients.
+    
+    The service and its generators are built once and reused across requests.
+    
+    Args:
+        supabase_client: The application-wide Supabase client
+        pg_pool: The application-wide asyncpg pool
+        
+    Returns:
+        The cached GenAIService instance
+    """
+    return GenAIService(supabase_client, pg_pool)
@@ -0,0 +1,110 @@
+"""
+Enterprise Architecture Solution - GenAI Activity Log
+
+This module buffers AI activity log rows and writes them to Supabase in batches
+from a background thread, so that auditing does not add a round-trip to every
+GenAI request.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class ActivityLogWriter:
+    """Batched writer for a Supabase log table."""
+    
+    def __init__(self, supabase_client, table: str = "ai_activity_logs",
+                 batch_size: int = 50, flush_interval: float = 0.5):
+        """Initialize the writer and start its background thread.
+        
+        Args:
+            supabase_client: A configured Supabase client
+            table: Table the rows are inserted into
+            batch_size: Maximum number of rows per insert
+            flush_interval: Maximum seconds a row waits before being written
+        """
+        self.supabase = supabase_client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ea-activity-log", daemon=True)
+        self._thread.start()
+        
+        # Write whatever is still buffered when the process exits
+        atexit.register(self.flush)
+    
+    def write(self, row: Dict[str, Any]):
+        """Queue a row for insertion.
+        
+        Args:
+            row: Column values for the new row
+        """
+        self._queue.put_nowait(row)
+    
+    def flush(self):
+        """Write all queued rows now."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        for start in range(0, len(batch), self.batch_size):
+            self._insert(batch[start:start + self.batch_size])
+    
+    def _run(self):
+        """Collect rows into batches and insert them until the process exits."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            self._insert(batch)
+    
+    def _insert(self, batch: List[Dict[str, Any]]):
+        """Insert a batch of rows, one request per distinct set of columns.
+        
+        Args:
+            batch: Rows to insert
+        """
+        # PostgREST bulk inserts require every row to have the same keys
+        groups = defaultdict(list)
+        for row in batch:
+            groups[frozenset(row)].append(row)
+        
+        for rows in groups.values():
+            try:
+                self.supabase.table(self.table).insert(rows).execute()
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} rows to {self.table}: {str(e)}")
+
+
+@lru_cache(maxsize=None)
+def get_activity_log_writer(supabase_client, table: str = "ai_activity_logs") -> ActivityLogWriter:
+    """Get the activity log writer for a Supabase client and table.
+    
+    Args:
+        supabase_client: A configured Supabase client
+        table: Table the rows are inserted into
+        
+    Returns:
+        The shared ActivityLogWriter for that client and table
+    """
+    return ActivityLogWriter(supabase_client, table)
@@ -6,38 +6,513 @@ OpenAI's Agents Python SDK. It provides multiple specialized agents for differen
 """
 
 import os
-import json
+import re
+import gzip
+import base64
+import time
+import uuid
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Annotated, AsyncIterator, Dict, Iterable, List, Any, Literal, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import orjson
+from anyio import from_thread, to_thread
 
 # OpenAI imports
-from openai import OpenAI
 from openai.agents import Agent, Step, Tool, run
 from openai.types import FunctionDefinition
 
-# Pydantic for schema validation
-from pydantic import BaseModel, Field
+from . import queries
+from .activity_log import get_activity_log_writer
+from .batch import submit_batch
+from .cache import (
+    ResultCache,
+    artifact_documentation_cache,
+    element_analysis_cache,
+    invalidate as invalidate_cache,
+    hash_text,
+    model_data_cache,
+    prompt_key,
+    recommendation_cache,
+)
+from .clients import get_async_openai_client, openai_slot, with_openai_retry
+from .prompts import EA_SYSTEM_PREFIX
+from .semantic_cache import SemanticCache
+
+# msgspec for schema validation
+import msgspec
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the application entrypoint
 logger = logging.getLogger(__name__)
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Model and fixed prompt parts used by the agent tools
+CHAT_MODEL = "gpt-4o"
+LIGHT_CHAT_MODEL = "gpt-4o-mini"
+
+# Element types simple enough to recommend improvements for with the light model
+LIGHT_RECOMMENDATION_TYPES = {
+    "business actor", "business role", "business object",
+    "data entity", "data store",
+    "application interface",
+    "node", "device", "network", "system software",
+}
+LIGHT_RECOMMENDATION_MAX_DESCRIPTION = 500
+
+def _pick_model(element_type: str, description: Optional[str] = None) -> str:
+    """Choose the chat model for an element recommendation.
+    
+    Short descriptions of simple element types go to the light model; anything
+    else keeps the full model.
+    """
+    normalized_type = element_type.replace("_", " ").replace("-", " ").lower()
+    if (normalized_type in LIGHT_RECOMMENDATION_TYPES
+            and len(description or "") < LIGHT_RECOMMENDATION_MAX_DESCRIPTION):
+        return LIGHT_CHAT_MODEL
+    return CHAT_MODEL
+
+# Element prompts share the long static EA prefix so OpenAI can reuse its cached prefix
+_RECOMMENDATION_SYSTEM_MESSAGE = {"role": "system", "content": EA_SYSTEM_PREFIX + "\n\n# Task\n\nYou are acting as an Enterprise Architecture expert advisor. Your task is to provide recommendations to improve architecture elements based on best practices."}
+_RECOMMENDATION_USER_PREFIX = "Please provide recommendations to improve this enterprise architecture element: "
+
+_ANALYSIS_SYSTEM_MESSAGE = {"role": "system", "content": EA_SYSTEM_PREFIX + "\n\n# Task\n\nYou are acting as an Enterprise Architecture analyst. Your task is to analyze architecture elements and their relationships, identifying strengths, weaknesses, and providing insights."}
+_ANALYSIS_USER_PREFIX = "Please analyze this enterprise architecture element and its relationships: "
+
+_DOCUMENTATION_AUDIENCE_INSTRUCTIONS = {
+    "technical": "Create detailed technical documentation suitable for IT architects and developers.",
+    "business": "Create business-focused documentation that explains concepts in business terms.",
+    "executive": "Create executive-level documentation focusing on strategic impacts and high-level insights.",
+}
+
+_DOCUMENTATION_FORMAT_INSTRUCTIONS = {
+    "markdown": " Format the documentation in Markdown.",
+    "html": " Format the documentation in HTML.",
+    "docx": " Format the documentation as if it would be exported to MS Word.",
+}
+
+def _documentation_system_message(audience: str, format: str) -> Dict[str, str]:
+    """Build the documentation system message for an audience and output format."""
+    return {
+        "role": "system",
+        "content": "You are an Enterprise Architecture documentation specialist. "
+                   + _DOCUMENTATION_AUDIENCE_INSTRUCTIONS.get(audience, "")
+                   + _DOCUMENTATION_FORMAT_INSTRUCTIONS.get(format, ""),
+    }
+
+# Every supported audience/format combination, built once
+_DOCUMENTATION_SYSTEM_MESSAGES = {
+    (audience, format): _documentation_system_message(audience, format)
+    for audience in _DOCUMENTATION_AUDIENCE_INSTRUCTIONS
+    for format in _DOCUMENTATION_FORMAT_INSTRUCTIONS
+}
+
+@lru_cache(maxsize=1)
+def _sync_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the event loop that runs async work for synchronous callers.
+
+    The loop runs for the life of the process in a daemon thread, so loop-bound
+    resources such as the async OpenAI client's connections are reused across calls.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="ea-agent-loop", daemon=True).start()
+    return loop
+
+async def _read_completion_text(params: Dict[str, Any]) -> str:
+    """Stream a chat completion with the shared async client and join its text."""
+    stream = await get_async_openai_client().chat.completions.create(stream=True, **params)
+    return "".join([
+        chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices
+    ])
+
+async def _acompletion_text(**params) -> str:
+    """Create a chat completion with the shared async client and return its text.
+    
+    The completion is streamed so tokens are read as they are generated; each
+    attempt holds its concurrency slot until the stream is fully read.
+    """
+    return await with_openai_retry(lambda: _read_completion_text(params))
+
+# Completion parameters shared by the interactive and batch paths
+_DOCUMENTATION_PARAMS = {"temperature": 0.5, "max_tokens": 4000}
+# Recommendations are cached and shared, so they are generated deterministically
+_RECOMMENDATION_PARAMS = {"temperature": 0, "seed": 42, "max_tokens": 400}
+_IMPACT_ANALYSIS_PARAMS = {"temperature": 0.5, "max_tokens": 2000}
+_PATTERN_RECOGNITION_PARAMS = {"temperature": 0.5, "max_tokens": 2500}
+
+# One element recommendation, see ElementSuggestion
+_ELEMENT_SUGGESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "rationale": {"type": "string"},
+        "priority": {"type": "string", "enum": ["low", "medium", "high"]},
+    },
+    "required": ["improvements", "rationale", "priority"],
+    "additionalProperties": False,
+}
+
+_RECOMMENDATION_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ea_recommendation",
+        "strict": True,
+        "schema": _ELEMENT_SUGGESTION_SCHEMA,
+    },
+}
+
+# Several element recommendations returned from one prompt, matched by element number
+_BATCH_RECOMMENDATION_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ea_recommendations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "recommendations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "recommendation": _ELEMENT_SUGGESTION_SCHEMA,
+                        },
+                        "required": ["index", "recommendation"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["recommendations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Patterns found for one pattern type
+_PATTERN_LIST_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "description": {"type": "string"},
+            "affected_elements": {"type": "array", "items": {"type": "string"}},
+            "recommendations": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["name", "description", "affected_elements", "recommendations"],
+        "additionalProperties": False,
+    },
+}
+
+def _pattern_response_format(pattern_types: List[str]) -> Dict[str, Any]:
+    """Build the structured output format for a pattern recognition request.
+    
+    Args:
+        pattern_types: Pattern types requested, each becoming a top-level key
+        
+    Returns:
+        A json_schema response_format with a summary and one pattern list per type
+    """
+    properties = {"summary": {"type": "string"}}
+    properties.update({pattern_type: _PATTERN_LIST_SCHEMA for pattern_type in pattern_types})
+    
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "ea_patterns",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+# Risk multipliers based on change type
+_RISK_MULTIPLIERS = {
+    "add": 0.7,
+    "modify": 1.0,
+    "replace": 1.2,
+    "remove": 1.5
+}
+
+def _no_impact_analysis() -> Dict[str, Any]:
+    """Impact analysis result for a change that reaches no other element."""
+    return {
+        "analysis_text": "No connected elements are affected by this change.",
+        "sections": {},
+        "risk_scores": {},
+        "affected_elements": 0,
+        "risk_level": "low"
+    }
+
+# Pattern recognition needs at least this many elements to be worth a completion
+MIN_PATTERN_ELEMENTS = 3
+
+def _no_patterns(pattern_types: List[str]) -> Dict[str, Any]:
+    """Pattern recognition result for a selection too small to analyze."""
+    return {
+        "analysis_text": f"Fewer than {MIN_PATTERN_ELEMENTS} elements were selected, so no patterns were identified.",
+        "patterns": {pattern_type: [] for pattern_type in pattern_types},
+        "pattern_count": 0
+    }
+
+def _pattern_embedding_text(model_data: Dict[str, Any], pattern_types: List[str]) -> str:
+    """Describe a pattern recognition request for the semantic cache.
+    
+    The requested pattern types come first and the model's elements follow as
+    short name/type lines, so truncation never drops what was asked for.
+    """
+    lines = [
+        f"{element.get('name')} ({element.get('type') or element.get('type_id')})"
+        for element in model_data["elements"]
+    ]
+    return "Pattern types: " + ", ".join(sorted(pattern_types)) + "\n" + "\n".join(sorted(lines))
+
+def _graph_fingerprint(elements: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> str:
+    """Hash the elements and relationships a semantic cache entry was built from.
+    
+    Scoping near-match lookups by this hash means any edit to the graph
+    misses the cache instead of serving an analysis of the old graph.
+    """
+    payload = orjson.dumps([elements, relationships], option=orjson.OPT_SORT_KEYS, default=str)
+    return hash_text(payload.decode())
+
+# Whitespace at either end of a line, including the \r of CRLF line endings
+_LINE_EDGE_WS_RE = re.compile(r"^[^\S\n]+|[^\S\n]+$", re.M)
+
+# A short stripped line ending in a colon starts a new section of an impact analysis
+_SECTION_RE = re.compile(r"^([^\n]{0,48}):$", re.M)
+
+# Overlaps independent Supabase REST reads when no asyncpg pool is available
+_io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ea-tool-io")
+
+# Background inserts retry with blocking backoff, so they never share the read pool
+_write_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ea-tool-write")
+
+def _dumps(obj: Any) -> str:
+    """Serialize prompt context to a JSON string.
+    
+    Supabase rows may carry datetime and UUID values, which are stringified.
+    """
+    return orjson.dumps(obj, default=str).decode()
+
+def _prune(obj: Any) -> Any:
+    """Drop None and empty values from prompt context to save prompt tokens."""
+    if isinstance(obj, dict):
+        pruned = {key: _prune(value) for key, value in obj.items()}
+        return {key: value for key, value in pruned.items() if value not in (None, {}, [], "")}
+    if isinstance(obj, list):
+        return [_prune(item) for item in obj]
+    return obj
+
+async def _acached_completion(cache: ResultCache, tags: Iterable[str] = (),
+                              semantic_cache: Optional[SemanticCache] = None,
+                              embedding_text: Optional[str] = None, **params) -> str:
+    """Get a chat completion with the shared async client, reusing the answer to
+    an identical earlier prompt.
+    
+    Args:
+        cache: Cache for this kind of completion
+        tags: Element or artifact IDs the answer depends on, for invalidation
+        semantic_cache: Optional shared cache consulted when the prompt is not cached locally
+        embedding_text: Request-specific part of the prompt used for the semantic
+            cache's nearest-neighbour lookup, instead of the full messages
+        **params: Arguments for client.chat.completions.create
+        
+    Returns:
+        The completion text
+    """
+    key = prompt_key(params["model"], params["messages"])
+    content = cache.get(key)
+    if content is None:
+        if semantic_cache is not None:
+            content = await semantic_cache.get_or_compute(
+                params["messages"], lambda: _acompletion_text(**params), embedding_text
+            )
+        else:
+            content = await _acompletion_text(**params)
+        cache.set(key, content, tags=tags)
+    return content
+
+# Columns read by the agent tools (large or unused columns are not fetched)
+MODEL_COLUMNS = "id,name,description,status,version,lifecycle_state,properties"
+ELEMENT_COLUMNS = "id,name,description,type_id,model_id,status,properties"
+RELATIONSHIP_COLUMNS = "id,source_element_id,target_element_id,relationship_type_id,name"
+
+# Fields of element and relationship rows worth sending to the model
+_PROMPT_ELEMENT_KEYS = ("id", "name", "description", "type", "type_id", "status", "properties")
+_PROMPT_RELATIONSHIP_KEYS = (
+    "id", "source_element_id", "target_element_id", "relationship_type", "relationship_type_id", "name"
+)
+
+def _project(row: Dict[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
+    """Keep only the given keys of a row."""
+    return {key: row[key] for key in keys if key in row}
+
+def _activity_row(activity_type: str, created_at: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+    """Build an ai_activity_logs row, timestamped now unless created_at is given."""
+    return {
+        "activity_type": activity_type,
+        **fields,
+        "created_at": created_at or datetime.now(timezone.utc).isoformat()
+    }
+
+def _first_row(result) -> Optional[Dict[str, Any]]:
+    """Get the first row of a Supabase response, or None if it returned no rows."""
+    data = result.data
+    return data[0] if data else None
+
+def _other_element_id(relationship: Dict[str, Any], element_id: str) -> str:
+    """Get the ID at the opposite end of a relationship from the given element."""
+    if relationship["target_element_id"] == element_id:
+        return relationship["source_element_id"]
+    return relationship["target_element_id"]
+
+def _insert_with_retry(supabase_client, table: str, row: Dict[str, Any],
+                       attempts: int = 4, backoff: float = 0.5):
+    """Insert a row, retrying failed attempts with exponential backoff."""
+    for attempt in range(attempts):
+        try:
+            supabase_client.table(table).insert(row).execute()
+            return
+        except Exception as e:
+            if attempt == attempts - 1:
+                logger.error(f"Error inserting into {table} after {attempts} attempts: {str(e)}")
+                return
+            logger.warning(f"Insert into {table} failed, retrying: {str(e)}")
+            time.sleep(backoff * 2 ** attempt)
+
+def _insert_in_background(supabase_client, table: str, row: Dict[str, Any]):
+    """Insert a row off the caller's critical path.
+    
+    Args:
+        supabase_client: A configured Supabase client
+        table: Table to insert into
+        row: Row to insert, including its ID so callers can refer to it immediately
+    """
+    _write_executor.submit(_insert_with_retry, supabase_client, table, row)
+
+def _compress_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Store an impact analysis with its free text gzipped; other fields stay queryable."""
+    stored = {key: value for key, value in analysis.items() if key != "analysis_text"}
+    stored["analysis_text_gz"] = base64.b64encode(
+        gzip.compress(analysis["analysis_text"].encode("utf-8"))
+    ).decode("ascii")
+    return stored
+
+def decompress_analysis(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore the analysis text of a saved impact analysis.
+    
+    Args:
+        row: An ea_impact_analyses row
+        
+    Returns:
+        The row with analysis_result carrying a plain analysis_text again
+    """
+    analysis = dict(row.get("analysis_result") or {})
+    compressed = analysis.pop("analysis_text_gz", None)
+    if compressed is not None:
+        analysis["analysis_text"] = gzip.decompress(base64.b64decode(compressed)).decode("utf-8")
+    return {**row, "analysis_result": analysis}
+
+def _chunked(items: List[Any], size: int = 200) -> List[List[Any]]:
+    """Split a list into consecutive chunks of at most the given size."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def _fetch_elements(supabase_client, element_ids, pg_pool=None) -> Dict[str, Dict[str, Any]]:
+    """Fetch a set of elements in a single query, keyed by ID.
+    
+    Reads go through the asyncpg pool when one is available. Tools run in worker
+    threads, so the query is handed back to the event loop that owns the pool.
+    """
+    if not element_ids:
+        return {}
+    
+    if pg_pool is not None:
+        rows = from_thread.run(pg_pool.fetch, queries.ELEMENTS_BY_IDS, list(element_ids))
+        return {row["id"]: dict(row) for row in rows}
+    
+    result = supabase_client.table("ea_elements").select(ELEMENT_COLUMNS).in_("id", list(element_ids)).execute()
+    return {row["id"]: row for row in result.data or []}
+
+def _fetch_relationships(supabase_client, element_ids, pg_pool=None) -> List[Dict[str, Any]]:
+    """Fetch relationships touching any of a set of elements in a single query."""
+    if not element_ids:
+        return []
+    
+    if pg_pool is not None:
+        rows = from_thread.run(pg_pool.fetch, queries.RELATIONSHIPS_FOR_ELEMENTS, list(element_ids))
+        return [dict(row) for row in rows]
+    
+    # Indexed lookup by either endpoint (returns RELATIONSHIP_COLUMNS)
+    result = supabase_client.rpc(
+        "get_element_relationships", {"element_ids": list(element_ids)}
+    ).execute()
+    return result.data or []
+
+async def _fetch_element_with_relationships_pg(pg_pool, element_id: str):
+    """Fetch an element and its relationships concurrently from the asyncpg pool."""
+    return await asyncio.gather(
+        pg_pool.fetch(queries.ELEMENTS_BY_IDS, [element_id]),
+        pg_pool.fetch(queries.RELATIONSHIPS_FOR_ELEMENTS, [element_id]),
+    )
+
+def _fetch_element_with_relationships(supabase_client, element_id: str,
+                                      pg_pool=None) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Fetch an element and the relationships touching it, overlapping both reads.
+    
+    Returns:
+        Tuple of the element (None if not found) and its relationships
+    """
+    if pg_pool is not None:
+        element_rows, relationship_rows = from_thread.run(
+            _fetch_element_with_relationships_pg, pg_pool, element_id
+        )
+        element = dict(element_rows[0]) if element_rows else None
+        return element, [dict(row) for row in relationship_rows]
+    
+    relationships = _io_executor.submit(_fetch_relationships, supabase_client, [element_id])
+    element = _fetch_elements(supabase_client, [element_id]).get(element_id)
+    return element, relationships.result()
+
+async def _fetch_model_data_pg(pg_pool, model_id: str, element_ids: Optional[List[str]],
+                               domain: Optional[str]):
+    """Fetch a model, its selected elements and their relationships concurrently."""
+    params = (model_id, element_ids or None, domain)
+    return await asyncio.gather(
+        pg_pool.fetchrow(queries.MODEL_DETAILS, model_id),
+        pg_pool.fetch(queries.MODEL_ELEMENTS, *params),
+        pg_pool.fetch(queries.MODEL_ELEMENT_RELATIONSHIPS, *params),
+    )
 
 # Base Schema Models for EA Artifacts
-class ElementBase(BaseModel):
+class SchemaBase(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """Base for EA artifact schemas; unset optional fields are left out of inserts."""
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict for Supabase inserts."""
+        return msgspec.to_builtins(self)
+
+
+class ElementBase(SchemaBase):
     """Base schema for EA elements."""
     id: Optional[str] = None
     name: str
     description: Optional[str] = None
     domain: str
     type: str
-    properties: Dict[str, Any] = Field(default_factory=dict)
+    properties: Dict[str, Any] = msgspec.field(default_factory=dict)
 
 
-class RelationshipBase(BaseModel):
+class RelationshipBase(SchemaBase):
     """Base schema for EA relationships."""
     id: Optional[str] = None
     name: str
@@ -45,70 +520,254 @@ class RelationshipBase(BaseModel):
     source_id: str
     target_id: str
     type: str
-    properties: Dict[str, Any] = Field(default_factory=dict)
+    properties: Dict[str, Any] = msgspec.field(default_factory=dict)
 
 
-class ViewBase(BaseModel):
+class ViewBase(SchemaBase):
     """Base schema for EA views."""
     id: Optional[str] = None
     name: str
     description: Optional[str] = None
     type: str
-    element_ids: List[str] = Field(default_factory=list)
-    relationship_ids: List[str] = Field(default_factory=list)
-    configuration: Dict[str, Any] = Field(default_factory=dict)
+    element_ids: List[str] = msgspec.field(default_factory=list)
+    relationship_ids: List[str] = msgspec.field(default_factory=list)
+    configuration: Dict[str, Any] = msgspec.field(default_factory=dict)
+
+
+# Tool arguments, validated up front so handlers can trust them
+Domain = Literal["business", "data", "application", "technology", "performance"]
+
+class _CreateElementArgs(msgspec.Struct, kw_only=True):
+    domain: Domain
+    element_type: str
+    name: str
+    description: Optional[str] = None
+    properties: Dict[str, Any] = msgspec.field(default_factory=dict)
+
+
+class _UpdateElementArgs(msgspec.Struct, kw_only=True):
+    element_id: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    properties: Optional[Dict[str, Any]] = None
+
+
+class _ElementIdArgs(msgspec.Struct, kw_only=True):
+    element_id: str
+
+
+class ElementSuggestion(msgspec.Struct):
+    """Structured element recommendation returned by the model."""
+    improvements: List[str]
+    rationale: str
+    priority: Literal["low", "medium", "high"]
+
+
+def _read_suggestion(text: str) -> Dict[str, Any]:
+    """Validate a structured recommendation and convert it to a plain dict."""
+    return msgspec.to_builtins(msgspec.json.decode(text, type=ElementSuggestion))
+
+
+class _RecommendElementArgs(msgspec.Struct, kw_only=True):
+    domain: Domain
+    element_type: str
+    name: str
+    description: Optional[str] = None
+
+
+class _DocumentationArgs(msgspec.Struct, kw_only=True):
+    artifact_type: Literal["element", "model", "view", "domain"]
+    artifact_id: str
+    format: Literal["markdown", "html", "docx"]
+    audience: Literal["technical", "business", "executive"] = "technical"
+    include_diagrams: bool = True
+    include_related: bool = True
+
+
+class _ImpactAnalysisArgs(msgspec.Struct, kw_only=True):
+    element_id: str
+    change_type: Literal["add", "modify", "replace", "remove"]
+    change_description: str
+    analysis_depth: Annotated[int, msgspec.Meta(ge=1, le=3)] = 2
+
+
+PatternType = Literal["best_practice", "anti_pattern", "optimization", "security", "integration"]
+DEFAULT_PATTERN_TYPES = ("best_practice", "anti_pattern", "optimization")
+
+class _PatternRecognitionArgs(msgspec.Struct, kw_only=True):
+    model_id: str
+    domain: Literal["business", "data", "application", "technology", "performance", "all"] = "all"
+    pattern_types: List[PatternType] = msgspec.field(default_factory=lambda: list(DEFAULT_PATTERN_TYPES))
+    element_ids: Optional[List[str]] = None
+
+
+def _validate_args(arguments: Dict[str, Any], args_type: type) -> Any:
+    """Validate tool arguments; omitted (None) values take the struct defaults."""
+    return msgspec.convert(
+        {key: value for key, value in arguments.items() if value is not None}, args_type
+    )
+
+
+# Function schemas for the agent tools, built once at import
+_ELEMENT_TOOL_FUNCTION = FunctionDefinition(
+    name="manage_ea_element",
+    description="Perform operations on EA elements",
+    parameters={
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["create", "update", "get", "recommend", "analyze"],
+                "description": "The action to perform"
+            },
+            "element_id": {
+                "type": "string",
+                "description": "UUID of the element (for update/get operations)"
+            },
+            "domain": {
+                "type": "string",
+                "enum": ["business", "data", "application", "technology", "performance"],
+                "description": "The architecture domain"
+            },
+            "element_type": {
+                "type": "string",
+                "description": "Type of element (e.g., 'process', 'service', 'database')"
+            },
+            "name": {
+                "type": "string",
+                "description": "Name of the element"
+            },
+            "description": {
+                "type": "string",
+                "description": "Description of the element"
+            },
+            "properties": {
+                "type": "object",
+                "description": "Additional properties for the element"
+            }
+        },
+        "required": ["action"]
+    }
+)
+
+_DOCUMENTATION_TOOL_FUNCTION = FunctionDefinition(
+    name="generate_documentation",
+    description="Generate documentation from EA artifacts",
+    parameters={
+        "type": "object",
+        "properties": {
+            "artifact_type": {
+                "type": "string",
+                "enum": ["element", "model", "view", "domain"],
+                "description": "Type of artifact to document"
+            },
+            "artifact_id": {
+                "type": "string",
+                "description": "ID of the artifact to document"
+            },
+            "format": {
+                "type": "string",
+                "enum": ["markdown", "html", "docx"],
+                "description": "Output format for the documentation"
+            },
+            "audience": {
+                "type": "string",
+                "enum": ["technical", "business", "executive"],
+                "description": "Target audience for the documentation"
+            },
+            "include_diagrams": {
+                "type": "boolean",
+                "description": "Whether to include diagrams"
+            },
+            "include_related": {
+                "type": "boolean",
+                "description": "Whether to include related artifacts"
+            }
+        },
+        "required": ["artifact_type", "artifact_id", "format"]
+    }
+)
+
+_IMPACT_ANALYSIS_TOOL_FUNCTION = FunctionDefinition(
+    name="analyze_impact",
+    description="Analyze the impact of changes to architecture elements",
+    parameters={
+        "type": "object",
+        "properties": {
+            "element_id": {
+                "type": "string",
+                "description": "ID of the element being changed"
+            },
+            "change_type": {
+                "type": "string",
+                "enum": ["add", "modify", "replace", "remove"],
+                "description": "Type of change being made"
+            },
+            "change_description": {
+                "type": "string",
+                "description": "Description of the proposed change"
+            },
+            "analysis_depth": {
+                "type": "integer",
+                "minimum": 1,
+                "maximum": 3,
+                "description": "Analysis depth (1=direct, 2=indirect, 3=comprehensive)"
+            }
+        },
+        "required": ["element_id", "change_type", "change_description"]
+    }
+)
+
+_PATTERN_RECOGNITION_TOOL_FUNCTION = FunctionDefinition(
+    name="recognize_patterns",
+    description="Identify architecture patterns and suggest improvements",
+    parameters={
+        "type": "object",
+        "properties": {
+            "model_id": {
+                "type": "string",
+                "description": "ID of the EA model to analyze"
+            },
+            "domain": {
+                "type": "string",
+                "enum": ["business", "data", "application", "technology", "performance", "all"],
+                "description": "Domain to focus analysis on"
+            },
+            "pattern_types": {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "enum": ["best_practice", "anti_pattern", "optimization", "security", "integration"]
+                },
+                "description": "Types of patterns to identify"
+            },
+            "element_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Specific element IDs to analyze (optional)"
+            }
+        },
+        "required": ["model_id"]
+    }
+)
 
 
 # Agent Tools
 class ElementTool(Tool):
     """Tool for working with EA elements."""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, pg_pool=None):
         """Initialize the Element Tool."""
         self.supabase = supabase_client
+        self.pg_pool = pg_pool
+        # Similar elements get similar advice, so near-duplicate prompts share an answer
+        self.recommendation_cache = SemanticCache(
+            supabase_client, "element_suggestion", max_distance=0.08, ttl=timedelta(hours=1)
+        )
         super().__init__(
             name="element_tool",
             description="Create, update, and retrieve enterprise architecture elements",
-            function=FunctionDefinition(
-                name="manage_ea_element",
-                description="Perform operations on EA elements",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "action": {
-                            "type": "string",
-                            "enum": ["create", "update", "get", "recommend", "analyze"],
-                            "description": "The action to perform"
-                        },
-                        "element_id": {
-                            "type": "string",
-                            "description": "UUID of the element (for update/get operations)"
-                        },
-                        "domain": {
-                            "type": "string",
-                            "enum": ["business", "data", "application", "technology", "performance"],
-                            "description": "The architecture domain"
-                        },
-                        "element_type": {
-                            "type": "string",
-                            "description": "Type of element (e.g., 'process', 'service', 'database')"
-                        },
-                        "name": {
-                            "type": "string",
-                            "description": "Name of the element"
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "Description of the element"
-                        },
-                        "properties": {
-                            "type": "object",
-                            "description": "Additional properties for the element"
-                        }
-                    },
-                    "required": ["action"]
-                }
-            )
+            function=_ELEMENT_TOOL_FUNCTION
         )
     
     def execute(self, action: str, element_id: Optional[str] = None, 
@@ -116,19 +775,25 @@ class ElementTool(Tool):
                 name: Optional[str] = None, description: Optional[str] = None,
                 properties: Optional[Dict] = None) -> Dict[str, Any]:
         """Execute the Element Tool."""
+        action_spec = self._ACTIONS.get(action)
+        if action_spec is None:
+            return {"error": f"Unknown action: {action}"}
+        
+        handler, args_type = action_spec
         try:
-            if action == "create":
-                return self._create_element(domain, element_type, name, description, properties)
-            elif action == "update":
-                return self._update_element(element_id, name, description, properties)
-            elif action == "get":
-                return self._get_element(element_id)
-            elif action == "recommend":
-                return self._recommend_element(domain, element_type, name, description)
-            elif action == "analyze":
-                return self._analyze_element(element_id)
-            else:
-                return {"error": f"Unknown action: {action}"}
+            args = _validate_args({
+                "element_id": element_id,
+                "domain": domain,
+                "element_type": element_type,
+                "name": name,
+                "description": description,
+                "properties": properties,
+            }, args_type)
+        except msgspec.ValidationError as e:
+            return {"error": f"Invalid arguments for {action}: {e}"}
+        
+        try:
+            return handler(self, **msgspec.structs.asdict(args))
         except Exception as e:
             logger.error(f"Error in Element Tool: {str(e)}")
             return {"error": str(e)}
@@ -137,30 +802,41 @@ class ElementTool(Tool):
                        description: str, properties: Dict) -> Dict[str, Any]:
         """Create a new EA element."""
         try:
-            # Prepare element data
+            # Prepare element data (arguments were validated by execute)
+            element = ElementBase(
+                domain=domain,
+                type=element_type,
+                name=name,
+                description=description,
+                properties=properties
+            )
+            
+            # One timestamp, so a new element has updated_at == created_at
+            now = datetime.now(timezone.utc).isoformat()
             element_data = {
-                "domain": domain,
-                "type": element_type,
-                "name": name,
-                "description": description,
-                "properties": properties or {},
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                **element.to_dict(),
+                "created_at": now,
+                "updated_at": now
             }
             
             # Insert into Supabase
             result = self.supabase.table("ea_elements").insert(element_data).execute()
             
-            if result.data and len(result.data) > 0:
-                return {
-                    "success": True,
-                    "element": result.data[0]
-                }
-            else:
+            row = _first_row(result)
+            if row is None:
                 return {
                     "success": False,
                     "message": "Failed to create element"
                 }
+            
+            # Drop cached reads of the model the element was added to
+            if row.get("model_id"):
+                invalidate_cache(row["model_id"])
+            
+            return {
+                "success": True,
+                "element": row
+            }
         except Exception as e:
             return {"success": False, "message": str(e)}
     
@@ -169,143 +845,302 @@ class ElementTool(Tool):
                        properties: Optional[Dict] = None) -> Dict[str, Any]:
         """Update an existing EA element."""
         try:
-            # Prepare update data
-            update_data = {
-                "updated_at": datetime.now().isoformat()
-            }
-            
-            if name:
-                update_data["name"] = name
-            
-            if description:
-                update_data["description"] = description
-                
             if properties:
-                # Get current properties and update them
-                current = self.supabase.table("ea_elements").select("properties").eq("id", element_id).execute()
-                if current.data and len(current.data) > 0:
-                    current_props = current.data[0].get("properties", {})
-                    # Merge properties
-                    merged_props = {**current_props, **properties}
-                    update_data["properties"] = merged_props
-            
-            # Update in Supabase
-            result = self.supabase.table("ea_elements").update(update_data).eq("id", element_id).execute()
-            
-            if result.data and len(result.data) > 0:
-                return {
-                    "success": True,
-                    "element": result.data[0]
-                }
+                # Merge properties in Postgres: one atomic round-trip, no read-modify-write
+                result = self.supabase.rpc("merge_ea_element_props", {
+                    "element_id": element_id,
+                    "patch": properties,
+                    "new_name": name or None,
+                    "new_description": description or None
+                }).execute()
             else:
+                # Prepare update data
+                update_data = {
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }
+                
+                if name:
+                    update_data["name"] = name
+                
+                if description:
+                    update_data["description"] = description
+                
+                # Update in Supabase
+                result = self.supabase.table("ea_elements").update(update_data).eq("id", element_id).execute()
+            
+            # Drop cached analyses that include the old version of the element
+            invalidate_cache(element_id)
+            
+            row = _first_row(result)
+            if row is None:
                 return {
                     "success": False,
                     "message": "Failed to update element or element not found"
                 }
+            
+            return {
+                "success": True,
+                "element": row
+            }
         except Exception as e:
             return {"success": False, "message": str(e)}
     
     def _get_element(self, element_id: str) -> Dict[str, Any]:
         """Get an EA element by ID."""
         try:
-            result = self.supabase.table("ea_elements").select("*").eq("id", element_id).execute()
-            
-            if result.data and len(result.data) > 0:
-                return {
-                    "success": True,
-                    "element": result.data[0]
-                }
-            else:
+            # Read through the shared asyncpg pool when available
+            row = _fetch_elements(self.supabase, [element_id], self.pg_pool).get(element_id)
+            if row is None:
                 return {
                     "success": False,
                     "message": "Element not found"
                 }
+            
+            return {
+                "success": True,
+                "element": row
+            }
         except Exception as e:
             return {"success": False, "message": str(e)}
     
     def _recommend_element(self, domain: str, element_type: str, 
                           name: str, description: str) -> Dict[str, Any]:
         """Recommend improvements to an EA element."""
+        # Run on the event loop, sharing the async client and its concurrency limit
+        return from_thread.run(self.arecommend_element, domain, element_type, name, description)
+    
+    def _recommendation_context(self, domain: str, element_type: str,
+                                name: str, description: Optional[str] = None) -> Dict[str, Any]:
+        """Build the AI context describing an element to recommend improvements for."""
+        return _prune({
+            "domain": domain,
+            "element_type": element_type,
+            "name": name,
+            "description": description,
+        })
+    
+    def _recommendation_messages(self, **element: Any) -> List[Dict[str, str]]:
+        """Build the prompt for a single element recommendation."""
+        return [
+            _RECOMMENDATION_SYSTEM_MESSAGE,
+            {"role": "user", "content": _RECOMMENDATION_USER_PREFIX + _dumps(self._recommendation_context(**element))}
+        ]
+    
+    async def arecommend_element(self, domain: str, element_type: str,
+                                 name: str, description: Optional[str] = None) -> Dict[str, Any]:
+        """Recommend improvements to an EA element from a running event loop."""
         try:
-            # Create context for the AI
-            context = {
-                "domain": domain,
-                "element_type": element_type,
-                "name": name,
-                "description": description,
-            }
-            
-            # Call OpenAI for recommendations
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an Enterprise Architecture expert advisor. Your task is to provide recommendations to improve architecture elements based on best practices."},
-                    {"role": "user", "content": f"Please provide recommendations to improve this enterprise architecture element: {json.dumps(context)}"}
-                ],
-                temperature=0.5,
-                max_tokens=800
+            messages = self._recommendation_messages(
+                domain=domain, element_type=element_type, name=name, description=description
             )
             
-            recommendation = response.choices[0].message.content
+            # Call OpenAI for recommendations; near-duplicate lookups compare only
+            # the element, not the shared system prefix
+            recommendation = await _acached_completion(
+                recommendation_cache,
+                semantic_cache=self.recommendation_cache,
+                embedding_text=messages[-1]["content"],
+                model=_pick_model(element_type, description),
+                messages=messages,
+                response_format=_RECOMMENDATION_FORMAT,
+                **_RECOMMENDATION_PARAMS
+            )
             
             # Log the recommendation activity
             self._log_ai_activity("recommendation", name, recommendation)
             
             return {
                 "success": True,
-                "recommendation": recommendation
+                "recommendation": _read_suggestion(recommendation)
             }
         except Exception as e:
             return {"success": False, "message": str(e)}
     
+    async def astream_recommendation(self, domain: str, element_type: str, name: str,
+                                     description: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a recommendation for an EA element as it is generated.
+        
+        A cached recommendation is yielded whole; otherwise completion deltas are
+        yielded as they arrive and the full text is cached and logged at the end.
+        The text is the JSON of an ElementSuggestion.
+        
+        Args:
+            domain: Element domain
+            element_type: Element type
+            name: Element name
+            description: Optional element description
+            
+        Yields:
+            Chunks of the recommendation JSON
+        """
+        messages = self._recommendation_messages(
+            domain=domain, element_type=element_type, name=name, description=description
+        )
+        model = _pick_model(element_type, description)
+        key = prompt_key(model, messages)
+        recommendation = recommendation_cache.get(key)
+        if recommendation is not None:
+            yield recommendation
+            return
+        
+        chunks = []
+        async with openai_slot():
+            # Only opening the stream is retried; yielded chunks cannot be taken back
+            stream = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
+                model=model, messages=messages, stream=True,
+                response_format=_RECOMMENDATION_FORMAT, **_RECOMMENDATION_PARAMS
+            ), acquire_slot=False)
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    chunks.append(content)
+                    yield content
+        
+        recommendation = "".join(chunks)
+        recommendation_cache.set(key, recommendation)
+        self._log_ai_activity("recommendation", name, recommendation)
+    
+    async def arecommend_elements(self, elements: List[Dict[str, Any]],
+                                  batch_size: int = 10) -> List[Dict[str, Any]]:
+        """Recommend improvements to several EA elements.
+        
+        Elements whose recommendation is not cached are grouped by model and packed
+        into prompts of up to batch_size elements each, and those prompts run
+        concurrently.
+        
+        Args:
+            elements: Keyword arguments for arecommend_element, one dict per element
+            batch_size: Maximum number of elements per prompt
+            
+        Returns:
+            One recommendation result per element, in order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(elements)
+        pending: Dict[str, List[Tuple[int, Dict[str, Any], str]]] = {}
+        
+        for index, element in enumerate(elements):
+            model = _pick_model(element["element_type"], element.get("description"))
+            key = prompt_key(model, self._recommendation_messages(**element))
+            recommendation = recommendation_cache.get(key)
+            if recommendation is not None:
+                results[index] = {"success": True, "recommendation": _read_suggestion(recommendation)}
+            else:
+                pending.setdefault(model, []).append((index, element, key))
+        
+        await asyncio.gather(*(
+            self._recommend_batch(model, batch, results)
+            for model, model_pending in pending.items()
+            for batch in _chunked(model_pending, batch_size)
+        ))
+        
+        return results
+    
+    async def _recommend_batch(self, model: str, batch: List[Tuple[int, Dict[str, Any], str]],
+                               results: List[Optional[Dict[str, Any]]]):
+        """Recommend improvements to a batch of elements in one completion.
+        
+        Each recommendation is also cached under its single-element prompt.
+        
+        Args:
+            model: Chat model picked for every element in the batch
+            batch: (result index, element arguments, single-prompt cache key) triples
+            results: Result list to fill in at each index
+        """
+        numbered = "\n".join(
+            f"[{number}] {_dumps(self._recommendation_context(**element))}"
+            for number, (_, element, _) in enumerate(batch, start=1)
+        )
+        
+        try:
+            structured_text = await _acompletion_text(
+                model=model,
+                messages=[
+                    _RECOMMENDATION_SYSTEM_MESSAGE,
+                    {"role": "user", "content": "Please provide recommendations to improve each of these numbered enterprise architecture elements. Return one entry per element, with the element's number as its index:\n" + numbered}
+                ],
+                response_format=_BATCH_RECOMMENDATION_FORMAT,
+                **{**_RECOMMENDATION_PARAMS, "max_tokens": _RECOMMENDATION_PARAMS["max_tokens"] * len(batch)}
+            )
+            recommendations = {
+                entry["index"]: msgspec.convert(entry["recommendation"], ElementSuggestion)
+                for entry in orjson.loads(structured_text)["recommendations"]
+            }
+        except Exception as e:
+            logger.error(f"Error in batched element recommendations: {str(e)}")
+            recommendations = {}
+        
+        for number, (index, element, key) in enumerate(batch, start=1):
+            recommendation = recommendations.get(number)
+            if recommendation is None:
+                results[index] = {"success": False, "message": "No recommendation was returned for this element"}
+                continue
+            
+            # Cached as the single-element prompt would have returned it
+            recommendation_text = msgspec.json.encode(recommendation).decode()
+            recommendation_cache.set(key, recommendation_text)
+            self._log_ai_activity("recommendation", element["name"], recommendation_text)
+            results[index] = {"success": True, "recommendation": msgspec.to_builtins(recommendation)}
+    
     def _analyze_element(self, element_id: str) -> Dict[str, Any]:
         """Analyze an EA element and provide insights."""
         try:
-            # Get the element
-            element_result = self.supabase.table("ea_elements").select("*").eq("id", element_id).execute()
+            # Get the element and its relationships concurrently
+            element, relationships = _fetch_element_with_relationships(
+                self.supabase, element_id, self.pg_pool
+            )
             
-            if not element_result.data or len(element_result.data) == 0:
+            if element is None:
                 return {
                     "success": False,
                     "message": "Element not found"
                 }
             
-            element = element_result.data[0]
-            
-            # Get related elements (relationships)
-            relationships_result = self.supabase.table("ea_relationships").select("*").or_(
-                f"source_element_id.eq.{element_id},target_element_id.eq.{element_id}"
-            ).execute()
+            # Fetch every related element in one query rather than one per relationship
+            others = _fetch_elements(
+                self.supabase, {_other_element_id(rel, element_id) for rel in relationships}, self.pg_pool
+            )
             
             related_elements = []
-            if relationships_result.data:
-                for relationship in relationships_result.data:
-                    other_id = relationship["source_element_id"] if relationship["target_element_id"] == element_id else relationship["target_element_id"]
-                    other_element = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-                    if other_element.data and len(other_element.data) > 0:
-                        related_elements.append({
-                            "element": other_element.data[0],
-                            "relationship": relationship
-                        })
-            
-            # Create context for the AI
-            context = {
+            for relationship in relationships:
+                other_element = others.get(_other_element_id(relationship, element_id))
+                if other_element is not None:
+                    related_elements.append({
+                        "element": other_element,
+                        "relationship": relationship
+                    })
+            
+            # Create context for the AI; related elements only need identifying fields.
+            # Rows read over REST carry type IDs rather than resolved type names
+            context = _prune({
                 "element": element,
-                "related_elements": related_elements
-            }
-            
-            # Call OpenAI for analysis
-            response = client.chat.completions.create(
-                model="gpt-4o",
+                "related_elements": [
+                    {
+                        "id": related["element"]["id"],
+                        "name": related["element"].get("name"),
+                        "type": related["element"].get("type") or related["element"].get("type_id"),
+                        "relationship_type": (
+                            related["relationship"].get("relationship_type")
+                            or related["relationship"].get("relationship_type_id")
+                        ),
+                        "direction": "incoming" if related["relationship"]["target_element_id"] == element_id else "outgoing"
+                    }
+                    for related in related_elements
+                ]
+            })
+            
+            # Call OpenAI for analysis on the event loop
+            analysis = from_thread.run(partial(
+                _acached_completion,
+                element_analysis_cache,
+                tags=[element_id, *others],
+                model=CHAT_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are an Enterprise Architecture analyst. Your task is to analyze architecture elements and their relationships, identifying strengths, weaknesses, and providing insights."},
-                    {"role": "user", "content": f"Please analyze this enterprise architecture element and its relationships: {json.dumps(context)}"}
+                    _ANALYSIS_SYSTEM_MESSAGE,
+                    {"role": "user", "content": _ANALYSIS_USER_PREFIX + _dumps(context)}
                 ],
                 temperature=0.5,
                 max_tokens=1000
-            )
-            
-            analysis = response.choices[0].message.content
+            ))
             
             # Log the analysis activity
             self._log_ai_activity("analysis", element["name"], analysis)
@@ -322,16 +1157,21 @@ class ElementTool(Tool):
     def _log_ai_activity(self, activity_type: str, element_name: str, content: str):
         """Log AI activity for auditing."""
         try:
-            activity_data = {
-                "activity_type": activity_type,
-                "element_name": element_name,
-                "content": content,
-                "created_at": datetime.now().isoformat()
-            }
+            activity_data = _activity_row(activity_type, element_name=element_name, content=content)
             
-            self.supabase.table("ai_activity_logs").insert(activity_data).execute()
+            # Queued and written in batches by a background thread
+            get_activity_log_writer(self.supabase).write(activity_data)
         except Exception as e:
             logger.error(f"Error logging AI activity: {str(e)}")
+    
+    # Dispatch table for execute(): handler and the arguments it takes
+    _ACTIONS = {
+        "create": (_create_element, _CreateElementArgs),
+        "update": (_update_element, _UpdateElementArgs),
+        "get": (_get_element, _ElementIdArgs),
+        "recommend": (_recommend_element, _RecommendElementArgs),
+        "analyze": (_analyze_element, _ElementIdArgs),
+    }
 
 
 class DocumentationTool(Tool):
@@ -343,64 +1183,41 @@ class DocumentationTool(Tool):
         super().__init__(
             name="documentation_tool",
             description="Generate documentation from enterprise architecture models and elements",
-            function=FunctionDefinition(
-                name="generate_documentation",
-                description="Generate documentation from EA artifacts",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "artifact_type": {
-                            "type": "string",
-                            "enum": ["element", "model", "view", "domain"],
-                            "description": "Type of artifact to document"
-                        },
-                        "artifact_id": {
-                            "type": "string",
-                            "description": "ID of the artifact to document"
-                        },
-                        "format": {
-                            "type": "string",
-                            "enum": ["markdown", "html", "docx"],
-                            "description": "Output format for the documentation"
-                        },
-                        "audience": {
-                            "type": "string",
-                            "enum": ["technical", "business", "executive"],
-                            "description": "Target audience for the documentation"
-                        },
-                        "include_diagrams": {
-                            "type": "boolean",
-                            "description": "Whether to include diagrams"
-                        },
-                        "include_related": {
-                            "type": "boolean",
-                            "description": "Whether to include related artifacts"
-                        }
-                    },
-                    "required": ["artifact_type", "artifact_id", "format"]
-                }
-            )
+            function=_DOCUMENTATION_TOOL_FUNCTION
         )
     
     def execute(self, artifact_type: str, artifact_id: str, format: str,
                audience: str = "technical", include_diagrams: bool = True,
                include_related: bool = True) -> Dict[str, Any]:
         """Execute the Documentation Tool."""
+        try:
+            args = _validate_args({
+                "artifact_type": artifact_type,
+                "artifact_id": artifact_id,
+                "format": format,
+                "audience": audience,
+                "include_diagrams": include_diagrams,
+                "include_related": include_related,
+            }, _DocumentationArgs)
+        except msgspec.ValidationError as e:
+            return {"success": False, "message": f"Invalid arguments: {e}"}
+        
         try:
             # Gather the artifact data
-            artifact_data = self._gather_artifact_data(artifact_type, artifact_id, include_related)
+            artifact_data = self._gather_artifact_data(args.artifact_type, args.artifact_id, args.include_related)
             
             if not artifact_data.get("success", False):
                 return artifact_data
             
             # Generate the documentation
             documentation = self._generate_documentation(
-                artifact_type, artifact_data, format, audience, include_diagrams
+                args.artifact_type, args.artifact_id, artifact_data, args.format, args.audience,
+                args.include_diagrams
             )
             
             # Save the generated documentation
             saved_doc = self._save_documentation(
-                artifact_type, artifact_id, format, audience, documentation
+                args.artifact_type, args.artifact_id, args.format, args.audience, documentation
             )
             
             return {
@@ -449,48 +1266,106 @@ class DocumentationTool(Tool):
         # Implementation details...
         return {"success": True, "domain": {}, "elements": []}
     
-    def _generate_documentation(self, artifact_type: str, artifact_data: Dict[str, Any],
+    def batch_execute(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Generate documentation for many artifacts as one OpenAI batch job.
+        
+        Intended for offline bulk runs such as documenting a whole model overnight;
+        blocks until the batch completes. Artifacts already documented in the cache
+        are not resubmitted.
+        
+        Args:
+            requests: Keyword arguments for execute(), one dict per artifact
+            
+        Returns:
+            One execute()-shaped result per request, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        documentations: List[Optional[str]] = [None] * len(requests)
+        arguments: List[Optional[_DocumentationArgs]] = [None] * len(requests)
+        pending = []
+        
+        for index, request in enumerate(requests):
+            try:
+                args = _validate_args(request, _DocumentationArgs)
+            except msgspec.ValidationError as e:
+                results[index] = {"success": False, "message": f"Invalid arguments: {e}"}
+                continue
+            
+            artifact_data = self._gather_artifact_data(args.artifact_type, args.artifact_id, args.include_related)
+            if not artifact_data.get("success", False):
+                results[index] = artifact_data
+                continue
+            
+            arguments[index] = args
+            messages = self._documentation_messages(args.artifact_type, artifact_data, args.format, args.audience)
+            key = prompt_key(CHAT_MODEL, messages)
+            documentations[index] = artifact_documentation_cache.get(key)
+            if documentations[index] is None:
+                pending.append((index, args, messages, key))
+        
+        try:
+            generated = submit_batch(
+                [messages for _, _, messages, _ in pending], model=CHAT_MODEL, **_DOCUMENTATION_PARAMS
+            )
+        except Exception as e:
+            logger.error(f"Error in documentation batch: {str(e)}")
+            generated = [None] * len(pending)
+        
+        for (index, args, _, key), documentation in zip(pending, generated):
+            if documentation is not None:
+                artifact_documentation_cache.set(key, documentation, tags=[args.artifact_id])
+                documentations[index] = documentation
+        
+        for index, args in enumerate(arguments):
+            if args is None:
+                continue
+            if documentations[index] is None:
+                results[index] = {"success": False, "message": "Documentation batch request failed"}
+                continue
+            
+            saved_doc = self._save_documentation(
+                args.artifact_type, args.artifact_id, args.format, args.audience, documentations[index]
+            )
+            results[index] = {
+                "success": True,
+                "documentation": documentations[index],
+                "document_id": saved_doc.get("document_id")
+            }
+        
+        return results
+    
+    def _documentation_messages(self, artifact_type: str, artifact_data: Dict[str, Any],
+                                format: str, audience: str) -> List[Dict[str, str]]:
+        """Build the documentation prompt for an artifact."""
+        # System prompt for the audience and format
+        system_message = _DOCUMENTATION_SYSTEM_MESSAGES.get(
+            (audience, format)
+        ) or _documentation_system_message(audience, format)
+        
+        # Create user prompt with artifact data
+        user_prompt = f"Generate {audience}-focused documentation for this {artifact_type}:\n\n"
+        user_prompt += _dumps(_prune(artifact_data))
+        
+        return [
+            system_message,
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _generate_documentation(self, artifact_type: str, artifact_id: str,
+                               artifact_data: Dict[str, Any],
                                format: str, audience: str, 
                                include_diagrams: bool) -> str:
         """Generate documentation for the artifact."""
         try:
-            # Create prompt based on the artifact type and audience
-            system_prompt = "You are an Enterprise Architecture documentation specialist. "
-            
-            if audience == "technical":
-                system_prompt += "Create detailed technical documentation suitable for IT architects and developers."
-            elif audience == "business":
-                system_prompt += "Create business-focused documentation that explains concepts in business terms."
-            elif audience == "executive":
-                system_prompt += "Create executive-level documentation focusing on strategic impacts and high-level insights."
-            
-            # Add format-specific instructions
-            if format == "markdown":
-                system_prompt += " Format the documentation in Markdown."
-            elif format == "html":
-                system_prompt += " Format the documentation in HTML."
-            elif format == "docx":
-                system_prompt += " Format the documentation as if it would be exported to MS Word."
-            
-            # Create user prompt with artifact data
-            user_prompt = f"Generate {audience}-focused documentation for this {artifact_type}:\n\n"
-            user_prompt += json.dumps(artifact_data)
-            
-            # Call OpenAI for documentation generation
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.5,
-                max_tokens=4000
-            )
-            
-            documentation = response.choices[0].message.content
-            
-            # Log the documentation generation activity
-            self._log_ai_activity("documentation", artifact_type, artifact_id, documentation)
+            # Call OpenAI for documentation generation on the event loop
+            documentation = from_thread.run(partial(
+                _acached_completion,
+                artifact_documentation_cache,
+                tags=[artifact_id],
+                model=CHAT_MODEL,
+                messages=self._documentation_messages(artifact_type, artifact_data, format, audience),
+                **_DOCUMENTATION_PARAMS
+            ))
             
             return documentation
         except Exception as e:
@@ -499,23 +1374,32 @@ class DocumentationTool(Tool):
     
     def _save_documentation(self, artifact_type: str, artifact_id: str, 
                            format: str, audience: str, documentation: str) -> Dict[str, Any]:
-        """Save the generated documentation."""
+        """Save the generated documentation and log the activity in one transaction."""
         try:
+            now = datetime.now(timezone.utc).isoformat()
             doc_data = {
                 "artifact_type": artifact_type,
                 "artifact_id": artifact_id,
                 "format": format,
                 "audience": audience,
                 "content": documentation,
-                "created_at": datetime.now().isoformat()
+                "created_at": now
             }
+            log_data = _activity_row(
+                "documentation",
+                created_at=now,
+                artifact_type=artifact_type,
+                artifact_id=artifact_id,
+                content_length=len(documentation)
+            )
             
-            result = self.supabase.table("ea_documentation").insert(doc_data).execute()
+            # Both rows are inserted by one database function (single round-trip)
+            result = self.supabase.rpc("insert_doc_and_log", {"doc": doc_data, "log": log_data}).execute()
             
-            if result.data and len(result.data) > 0:
+            if result.data:
                 return {
                     "success": True,
-                    "document_id": result.data[0]["id"]
+                    "document_id": result.data
                 }
             else:
                 return {
@@ -525,82 +1409,51 @@ class DocumentationTool(Tool):
         except Exception as e:
             logger.error(f"Error saving documentation: {str(e)}")
             return {"success": False, "message": str(e)}
-    
-    def _log_ai_activity(self, activity_type: str, artifact_type: str, 
-                        artifact_id: str, content: str):
-        """Log AI activity for auditing."""
-        try:
-            activity_data = {
-                "activity_type": activity_type,
-                "artifact_type": artifact_type,
-                "artifact_id": artifact_id,
-                "content_length": len(content),
-                "created_at": datetime.now().isoformat()
-            }
-            
-            self.supabase.table("ai_activity_logs").insert(activity_data).execute()
-        except Exception as e:
-            logger.error(f"Error logging AI activity: {str(e)}")
 
 
 class ImpactAnalysisTool(Tool):
     """Tool for analyzing the impact of architecture changes."""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, pg_pool=None):
         """Initialize the Impact Analysis Tool."""
         self.supabase = supabase_client
+        self.pg_pool = pg_pool
+        self.analysis_cache = SemanticCache(supabase_client, "impact_analysis")
         super().__init__(
             name="impact_analysis_tool",
             description="Analyze the impact of changes to architecture elements",
-            function=FunctionDefinition(
-                name="analyze_impact",
-                description="Analyze the impact of changes to architecture elements",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "element_id": {
-                            "type": "string",
-                            "description": "ID of the element being changed"
-                        },
-                        "change_type": {
-                            "type": "string",
-                            "enum": ["add", "modify", "replace", "remove"],
-                            "description": "Type of change being made"
-                        },
-                        "change_description": {
-                            "type": "string",
-                            "description": "Description of the proposed change"
-                        },
-                        "analysis_depth": {
-                            "type": "integer",
-                            "minimum": 1,
-                            "maximum": 3,
-                            "description": "Analysis depth (1=direct, 2=indirect, 3=comprehensive)"
-                        }
-                    },
-                    "required": ["element_id", "change_type", "change_description"]
-                }
-            )
+            function=_IMPACT_ANALYSIS_TOOL_FUNCTION
         )
     
     def execute(self, element_id: str, change_type: str, change_description: str,
                analysis_depth: int = 2) -> Dict[str, Any]:
         """Execute the Impact Analysis Tool."""
+        try:
+            args = _validate_args({
+                "element_id": element_id,
+                "change_type": change_type,
+                "change_description": change_description,
+                "analysis_depth": analysis_depth,
+            }, _ImpactAnalysisArgs)
+        except msgspec.ValidationError as e:
+            return {"success": False, "message": f"Invalid arguments: {e}"}
+        
         try:
             # Gather the element data
-            element_data = self._gather_element_data(element_id, analysis_depth)
+            element_data = self._gather_element_data(args.element_id, args.analysis_depth)
             
             if not element_data.get("success", False):
                 return element_data
             
-            # Perform impact analysis
-            analysis = self._perform_impact_analysis(
-                element_data, change_type, change_description, analysis_depth
+            # Perform impact analysis on the event loop
+            analysis = from_thread.run(
+                self._perform_impact_analysis,
+                element_data, args.change_type, args.change_description, args.analysis_depth
             )
             
             # Save the analysis results
             saved_analysis = self._save_impact_analysis(
-                element_id, change_type, change_description, analysis
+                args.element_id, args.change_type, args.change_description, analysis
             )
             
             return {
@@ -615,62 +1468,51 @@ class ImpactAnalysisTool(Tool):
     def _gather_element_data(self, element_id: str, depth: int) -> Dict[str, Any]:
         """Gather data about an element and its dependencies."""
         try:
-            # Get the element
-            element_result = self.supabase.table("ea_elements").select("*").eq("id", element_id).execute()
+            # Get the element and its direct relationships concurrently
+            element, direct_relationships = _fetch_element_with_relationships(
+                self.supabase, element_id, self.pg_pool
+            )
             
-            if not element_result.data or len(element_result.data) == 0:
+            if element is None:
                 return {
                     "success": False,
                     "message": "Element not found"
                 }
             
-            element = element_result.data[0]
-            
-            # Get direct relationships
-            direct_relationships = self._get_element_relationships(element_id)
-            
-            # Get indirect relationships if depth > 1
+            # Unique neighbours one and two hops away; each is fetched at most once
+            direct_ids = {_other_element_id(rel, element_id) for rel in direct_relationships}
             indirect_relationships = []
-            if depth > 1:
-                for relation in direct_relationships:
-                    other_id = relation["source_element_id"] if relation["target_element_id"] == element_id else relation["target_element_id"]
-                    indirect_rels = self._get_element_relationships(other_id)
-                    # Filter out relationships back to the original element
-                    indirect_relationships.extend([
-                        r for r in indirect_rels 
-                        if r["source_element_id"] != element_id and r["target_element_id"] != element_id
-                    ])
-            
-            # Get all affected elements
+            indirect_ids = set()
+            if depth > 1 and direct_ids:
+                indirect_rels = self._get_relationships_for_elements(direct_ids)
+                # Filter out relationships back to the original element
+                indirect_relationships = [
+                    r for r in indirect_rels 
+                    if r["source_element_id"] != element_id and r["target_element_id"] != element_id
+                ]
+                indirect_ids = {
+                    other_id
+                    for relation in indirect_relationships
+                    for other_id in (relation["source_element_id"], relation["target_element_id"])
+                } - direct_ids - {element_id}
+            
+            # Fetch every affected element in one query
+            elements_by_id = _fetch_elements(self.supabase, direct_ids | indirect_ids, self.pg_pool)
+            
+            # Get all affected elements, keyed by ID
             affected_elements = {}
-            
-            # Add directly connected elements
-            for relation in direct_relationships:
-                other_id = relation["source_element_id"] if relation["target_element_id"] == element_id else relation["target_element_id"]
-                if other_id not in affected_elements:
-                    element_data = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-                    if element_data.data and len(element_data.data) > 0:
-                        affected_elements[other_id] = {
-                            "element": element_data.data[0],
-                            "relationship": relation,
-                            "impact_level": "direct"
-                        }
-            
-            # Add indirectly connected elements if depth > 1
-            if depth > 1:
-                for relation in indirect_relationships:
-                    source_id = relation["source_element_id"]
-                    target_id = relation["target_element_id"]
-                    
-                    for other_id in [source_id, target_id]:
-                        if other_id not in affected_elements and other_id != element_id:
-                            element_data = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-                            if element_data.data and len(element_data.data) > 0:
-                                affected_elements[other_id] = {
-                                    "element": element_data.data[0],
-                                    "relationship": relation,
-                                    "impact_level": "indirect"
-                                }
+            for relationships, impact_level, ids in (
+                (direct_relationships, "direct", direct_ids),
+                (indirect_relationships, "indirect", indirect_ids),
+            ):
+                for relation in relationships:
+                    for other_id in (relation["source_element_id"], relation["target_element_id"]):
+                        if other_id in ids and other_id not in affected_elements and other_id in elements_by_id:
+                            affected_elements[other_id] = {
+                                "element": elements_by_id[other_id],
+                                "relationship": relation,
+                                "impact_level": impact_level
+                            }
             
             return {
                 "success": True,
@@ -684,136 +1526,222 @@ class ImpactAnalysisTool(Tool):
     
     def _get_element_relationships(self, element_id: str) -> List[Dict[str, Any]]:
         """Get relationships for an element."""
+        return self._get_relationships_for_elements([element_id])
+    
+    def _get_relationships_for_elements(self, element_ids) -> List[Dict[str, Any]]:
+        """Get relationships touching any of a set of elements in one query."""
         try:
-            relationships_result = self.supabase.table("ea_relationships").select("*").or_(
-                f"source_element_id.eq.{element_id},target_element_id.eq.{element_id}"
-            ).execute()
-            
-            if relationships_result.data:
-                return relationships_result.data
-            return []
+            return _fetch_relationships(self.supabase, element_ids, self.pg_pool)
         except Exception as e:
             logger.error(f"Error getting element relationships: {str(e)}")
             return []
     
-    def _perform_impact_analysis(self, element_data: Dict[str, Any], change_type: str,
-                                change_description: str, depth: int) -> Dict[str, Any]:
-        """Perform impact analysis on the changes."""
-        try:
-            # Create context for the AI
-            context = {
-                "element": element_data["element"],
-                "change_type": change_type,
-                "change_description": change_description,
-                "direct_relationships": element_data["direct_relationships"],
-                "affected_elements": element_data["affected_elements"],
-                "analysis_depth": depth
-            }
+    def batch_execute(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run many impact analyses as one OpenAI batch job.
+        
+        Intended for non-interactive scans; blocks until the batch completes.
+        
+        Args:
+            requests: Keyword arguments for execute(), one dict per analysis
+            
+        Returns:
+            One execute()-shaped result per request, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = []
+        analyses = []
+        
+        for index, request in enumerate(requests):
+            try:
+                args = _validate_args(request, _ImpactAnalysisArgs)
+            except msgspec.ValidationError as e:
+                results[index] = {"success": False, "message": f"Invalid arguments: {e}"}
+                continue
+            
+            element_data = self._gather_element_data(args.element_id, args.analysis_depth)
+            if not element_data.get("success", False):
+                results[index] = element_data
+                continue
             
-            # Call OpenAI for impact analysis
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an Enterprise Architecture impact analyst. Your task is to analyze the impact of proposed changes on connected architecture elements."},
-                    {"role": "user", "content": f"Analyze the impact of this change to an EA element: {json.dumps(context)}"}
+            if not element_data["affected_elements"]:
+                analyses.append((index, args, _no_impact_analysis()))
+            else:
+                pending.append((index, args, element_data))
+        
+        try:
+            analysis_texts = submit_batch(
+                [
+                    self._impact_analysis_messages(
+                        element_data, args.change_type, args.change_description, args.analysis_depth
+                    )
+                    for _, args, element_data in pending
                 ],
-                temperature=0.5,
-                max_tokens=2000
+                model=CHAT_MODEL,
+                **_IMPACT_ANALYSIS_PARAMS
             )
+        except Exception as e:
+            logger.error(f"Error in impact analysis batch: {str(e)}")
+            analysis_texts = [None] * len(pending)
+        
+        for (index, args, element_data), analysis_text in zip(pending, analysis_texts):
+            if analysis_text is None:
+                results[index] = {"success": False, "message": "Impact analysis batch request failed"}
+                continue
             
-            analysis_text = response.choices[0].message.content
-            
-            # Parse out key sections from the analysis
-            sections = self._parse_analysis_sections(analysis_text)
+            analyses.append(
+                (index, args, self._build_impact_analysis(element_data, args.change_type, analysis_text))
+            )
+        
+        for index, args, analysis in analyses:
+            saved_analysis = self._save_impact_analysis(
+                args.element_id, args.change_type, args.change_description, analysis
+            )
+            results[index] = {
+                "success": True,
+                "impact_analysis": analysis,
+                "analysis_id": saved_analysis.get("analysis_id")
+            }
+        
+        return results
+    
+    def _impact_analysis_messages(self, element_data: Dict[str, Any], change_type: str,
+                                  change_description: str, depth: int) -> List[Dict[str, str]]:
+        """Build the impact analysis prompt."""
+        # Create context for the AI
+        context = {
+            "element": element_data["element"],
+            "change_type": change_type,
+            "change_description": change_description,
+            "direct_relationships": [
+                _project(relationship, _PROMPT_RELATIONSHIP_KEYS)
+                for relationship in element_data["direct_relationships"]
+            ],
+            "affected_elements": [
+                {
+                    "element": _project(affected["element"], _PROMPT_ELEMENT_KEYS),
+                    "relationship": _project(affected["relationship"], _PROMPT_RELATIONSHIP_KEYS),
+                    "impact_level": affected["impact_level"]
+                }
+                for affected in element_data["affected_elements"]
+            ],
+            "analysis_depth": depth
+        }
+        
+        return [
+            {"role": "system", "content": "You are an Enterprise Architecture impact analyst. Your task is to analyze the impact of proposed changes on connected architecture elements."},
+            {"role": "user", "content": f"Analyze the impact of this change to an EA element: {_dumps(context)}"}
+        ]
+    
+    async def _perform_impact_analysis(self, element_data: Dict[str, Any], change_type: str,
+                                      change_description: str, depth: int) -> Dict[str, Any]:
+        """Perform impact analysis on the changes."""
+        # Nothing connected is affected, so there is nothing for the model to assess
+        if not element_data["affected_elements"]:
+            return _no_impact_analysis()
+        
+        try:
+            messages = self._impact_analysis_messages(
+                element_data, change_type, change_description, depth
+            )
             
-            # Calculate risk scores for each affected element
-            risk_scores = self._calculate_risk_scores(
-                element_data["affected_elements"], 
-                change_type,
-                sections
+            # Call OpenAI for impact analysis unless an equivalent one is cached. Near
+            # matches are limited to the same element, change type, depth and
+            # surrounding graph, and compare only the change description
+            graph = _graph_fingerprint(
+                [element_data["element"]] + [affected["element"] for affected in element_data["affected_elements"]],
+                element_data["direct_relationships"] + [affected["relationship"] for affected in element_data["affected_elements"]]
+            )
+            cache = self.analysis_cache.scoped(
+                f"{element_data['element']['id']}:{change_type}:{depth}:{graph}"
+            )
+            analysis_text = await cache.get_or_compute(
+                messages,
+                lambda: _acompletion_text(model=CHAT_MODEL, messages=messages, **_IMPACT_ANALYSIS_PARAMS),
+                embedding_text=change_description
             )
             
-            return {
-                "analysis_text": analysis_text,
-                "sections": sections,
-                "risk_scores": risk_scores,
-                "affected_elements": len(element_data["affected_elements"]),
-                "risk_level": self._determine_overall_risk(risk_scores)
-            }
+            return self._build_impact_analysis(element_data, change_type, analysis_text)
         except Exception as e:
             logger.error(f"Error performing impact analysis: {str(e)}")
             raise
     
+    def _build_impact_analysis(self, element_data: Dict[str, Any], change_type: str,
+                               analysis_text: str) -> Dict[str, Any]:
+        """Score the affected elements against the model's analysis."""
+        # Parse out key sections from the analysis
+        sections = self._parse_analysis_sections(analysis_text)
+        
+        # Calculate risk scores for each affected element
+        risk_scores = self._calculate_risk_scores(
+            element_data["affected_elements"], 
+            change_type,
+            sections
+        )
+        
+        return {
+            "analysis_text": analysis_text,
+            "sections": sections,
+            "risk_scores": risk_scores,
+            "affected_elements": len(element_data["affected_elements"]),
+            "risk_level": self._determine_overall_risk(risk_scores)
+        }
+    
     def _parse_analysis_sections(self, analysis_text: str) -> Dict[str, str]:
-        """Parse key sections from the analysis text."""
-        # Simple section parsing - this could be enhanced with more sophisticated parsing
-        sections = {}
-        current_section = "summary"
-        current_content = []
-        
-        for line in analysis_text.split('\n'):
-            line = line.strip()
-            if line.endswith(':') and len(line) < 50:  # Likely a section header
-                if current_content:
-                    sections[current_section] = '\n'.join(current_content)
-                    current_content = []
-                current_section = line[:-1].lower().replace(' ', '_')
-            else:
-                current_content.append(line)
+        """Parse key sections from the analysis text.
         
-        # Add the last section
-        if current_content:
-            sections[current_section] = '\n'.join(current_content)
+        Lines are stripped and blank lines kept, so each section body is its
+        lines joined by newlines.
+        """
+        # Splitting on header lines yields the preamble, then alternating headers and bodies
+        parts = _SECTION_RE.split(_LINE_EDGE_WS_RE.sub("", analysis_text))
+        headers = ["summary"] + [header.lower().replace(' ', '_') for header in parts[1::2]]
+        bodies = parts[::2]
+        last = len(bodies) - 1
         
+        sections = {}
+        for index, (header, body) in enumerate(zip(headers, bodies)):
+            # Drop the line breaks belonging to the header lines on either side;
+            # a section without any lines is left out
+            start = 1 if index else 0
+            end = len(body) if index == last else len(body) - 1
+            if end >= start:
+                sections[header] = body[start:end]
         return sections
     
     def _calculate_risk_scores(self, affected_elements: List[Dict[str, Any]],
                               change_type: str, analysis_sections: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
         """Calculate risk scores for affected elements."""
-        risk_scores = {}
-        
-        # Define risk multipliers based on change type
-        risk_multipliers = {
-            "add": 0.7,
-            "modify": 1.0,
-            "replace": 1.2,
-            "remove": 1.5
-        }
+        if not affected_elements:
+            return {}
         
-        multiplier = risk_multipliers.get(change_type, 1.0)
+        multiplier = _RISK_MULTIPLIERS.get(change_type, 1.0)
         
-        for affected in affected_elements:
-            element = affected["element"]
-            impact_level = affected["impact_level"]
-            
-            # Base risk based on impact level
-            base_risk = 0.8 if impact_level == "direct" else 0.4
-            
-            # Calculate final risk score
-            final_risk = base_risk * multiplier
-            
-            # Limit to range 0-1
-            final_risk = min(max(final_risk, 0), 1)
-            
-            # Convert to qualitative risk level
-            risk_level = "high" if final_risk > 0.7 else "medium" if final_risk > 0.3 else "low"
-            
-            risk_scores[element["id"]] = {
-                "element_name": element["name"],
-                "impact_level": impact_level,
-                "risk_score": round(final_risk, 2),
+        # Base risk based on impact level, scaled and limited to range 0-1
+        levels = np.array([affected["impact_level"] for affected in affected_elements])
+        final_risks = np.clip(np.where(levels == "direct", 0.8, 0.4) * multiplier, 0, 1)
+        
+        # Convert to qualitative risk levels
+        risk_levels = np.where(final_risks > 0.7, "high", np.where(final_risks > 0.3, "medium", "low"))
+        
+        return {
+            affected["element"]["id"]: {
+                "element_name": affected["element"]["name"],
+                "impact_level": affected["impact_level"],
+                "risk_score": risk_score,
                 "risk_level": risk_level
             }
-        
-        return risk_scores
+            for affected, risk_score, risk_level in zip(
+                affected_elements, final_risks.round(2).tolist(), risk_levels.tolist()
+            )
+        }
     
     def _determine_overall_risk(self, risk_scores: Dict[str, Dict[str, Any]]) -> str:
         """Determine the overall risk level based on individual risk scores."""
         if not risk_scores:
             return "unknown"
         
-        high_count = sum(1 for score in risk_scores.values() if score["risk_level"] == "high")
-        medium_count = sum(1 for score in risk_scores.values() if score["risk_level"] == "medium")
+        level_counts = Counter(score["risk_level"] for score in risk_scores.values())
+        high_count, medium_count = level_counts["high"], level_counts["medium"]
         
         if high_count > 2 or high_count > len(risk_scores) / 3:
             return "high"
@@ -830,23 +1758,19 @@ class ImpactAnalysisTool(Tool):
                 "element_id": element_id,
                 "change_type": change_type,
                 "change_description": change_description,
-                "analysis_result": analysis,
+                "analysis_result": _compress_analysis(analysis),
                 "risk_level": analysis["risk_level"],
-                "created_at": datetime.now().isoformat()
+                "created_at": datetime.now(timezone.utc).isoformat()
             }
             
-            result = self.supabase.table("ea_impact_analyses").insert(analysis_data).execute()
+            # The ID is assigned here so the insert can finish in the background
+            analysis_data["id"] = str(uuid.uuid4())
+            _insert_in_background(self.supabase, "ea_impact_analyses", analysis_data)
             
-            if result.data and len(result.data) > 0:
-                return {
-                    "success": True,
-                    "analysis_id": result.data[0]["id"]
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": "Failed to save impact analysis"
-                }
+            return {
+                "success": True,
+                "analysis_id": analysis_data["id"]
+            }
         except Exception as e:
             logger.error(f"Error saving impact analysis: {str(e)}")
             return {"success": False, "message": str(e)}
@@ -855,44 +1779,15 @@ class ImpactAnalysisTool(Tool):
 class PatternRecognitionTool(Tool):
     """Tool for recognizing and suggesting architecture patterns."""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, pg_pool=None):
         """Initialize the Pattern Recognition Tool."""
         self.supabase = supabase_client
+        self.pg_pool = pg_pool
+        self.recognition_cache = SemanticCache(supabase_client, "pattern_recognition")
         super().__init__(
             name="pattern_recognition_tool",
             description="Recognize architecture patterns and suggest improvements",
-            function=FunctionDefinition(
-                name="recognize_patterns",
-                description="Identify architecture patterns and suggest improvements",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "model_id": {
-                            "type": "string",
-                            "description": "ID of the EA model to analyze"
-                        },
-                        "domain": {
-                            "type": "string",
-                            "enum": ["business", "data", "application", "technology", "performance", "all"],
-                            "description": "Domain to focus analysis on"
-                        },
-                        "pattern_types": {
-                            "type": "array",
-                            "items": {
-                                "type": "string",
-                                "enum": ["best_practice", "anti_pattern", "optimization", "security", "integration"]
-                            },
-                            "description": "Types of patterns to identify"
-                        },
-                        "element_ids": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Specific element IDs to analyze (optional)"
-                        }
-                    },
-                    "required": ["model_id"]
-                }
-            )
+            function=_PATTERN_RECOGNITION_TOOL_FUNCTION
         )
     
     def execute(self, model_id: str, domain: str = "all",
@@ -900,21 +1795,31 @@ class PatternRecognitionTool(Tool):
                element_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """Execute the Pattern Recognition Tool."""
         try:
-            # Set defaults
-            if pattern_types is None:
-                pattern_types = ["best_practice", "anti_pattern", "optimization"]
-            
+            args = _validate_args({
+                "model_id": model_id,
+                "domain": domain,
+                "pattern_types": pattern_types,
+                "element_ids": element_ids,
+            }, _PatternRecognitionArgs)
+        except msgspec.ValidationError as e:
+            return {"success": False, "message": f"Invalid arguments: {e}"}
+        
+        try:
             # Gather architecture data
-            model_data = self._gather_model_data(model_id, domain, element_ids)
+            model_data = self._gather_model_data(args.model_id, args.domain, args.element_ids)
             
             if not model_data.get("success", False):
                 return model_data
             
-            # Recognize patterns
-            patterns = self._recognize_patterns(model_data, pattern_types)
+            # Recognize patterns on the event loop
+            patterns = from_thread.run(
+                self._recognize_patterns, model_data, args.pattern_types, args.domain
+            )
             
             # Save the results
-            saved_result = self._save_pattern_recognition(model_id, domain, pattern_types, patterns)
+            saved_result = self._save_pattern_recognition(
+                args.model_id, args.domain, args.pattern_types, patterns
+            )
             
             return {
                 "success": True,
@@ -927,21 +1832,36 @@ class PatternRecognitionTool(Tool):
     
     def _gather_model_data(self, model_id: str, domain: str, 
                           element_ids: Optional[List[str]]) -> Dict[str, Any]:
-        """Gather data about the model elements."""
+        """Gather data about the model elements, reusing a recent read of the same selection."""
+        key = (model_id, domain, tuple(sorted(element_ids or ())))
+        model_data = model_data_cache.get(key)
+        if model_data is None:
+            model_data = self._read_model_data(model_id, domain, element_ids)
+            if model_data["success"]:
+                model_data_cache.set(
+                    key, model_data, tags=[model_id, *(e["id"] for e in model_data["elements"])]
+                )
+        return model_data
+    
+    def _read_model_data(self, model_id: str, domain: str,
+                         element_ids: Optional[List[str]]) -> Dict[str, Any]:
+        """Read the model, its selected elements and their relationships."""
+        if self.pg_pool is not None:
+            return self._read_model_data_pg(model_id, domain, element_ids)
+        
         try:
             # Get the model
-            model_result = self.supabase.table("ea_models").select("*").eq("id", model_id).execute()
+            model_result = self.supabase.table("ea_models").select(MODEL_COLUMNS).eq("id", model_id).execute()
             
-            if not model_result.data or len(model_result.data) == 0:
+            model = _first_row(model_result)
+            if model is None:
                 return {
                     "success": False,
                     "message": "Model not found"
                 }
             
-            model = model_result.data[0]
-            
             # Get elements
-            elements_query = self.supabase.table("ea_elements").select("*").eq("model_id", model_id)
+            elements_query = self.supabase.table("ea_elements").select(ELEMENT_COLUMNS).eq("model_id", model_id)
             
             # Filter by domain if specified
             if domain != "all":
@@ -954,14 +1874,20 @@ class PatternRecognitionTool(Tool):
             elements_result = elements_query.execute()
             elements = elements_result.data or []
             
-            # Get relationships
+            # Get relationships in concurrent chunks; the RPC takes the IDs in its
+            # POST body, so large models do not hit URL length limits
             relationships = []
             if elements:
                 element_ids_list = [e["id"] for e in elements]
-                relationships_result = self.supabase.table("ea_relationships").select("*").or_(
-                    f"source_element_id.in.({','.join(element_ids_list)}),target_element_id.in.({','.join(element_ids_list)})"
-                ).execute()
-                relationships = relationships_result.data or []
+                chunk_results = _io_executor.map(
+                    lambda chunk: _fetch_relationships(self.supabase, chunk), _chunked(element_ids_list)
+                )
+                # A relationship between two chunks is returned by both
+                relationships = list({
+                    relationship["id"]: relationship
+                    for chunk in chunk_results
+                    for relationship in chunk
+                }.values())
             
             return {
                 "success": True,
@@ -972,106 +1898,180 @@ class PatternRecognitionTool(Tool):
         except Exception as e:
             return {"success": False, "message": str(e)}
     
-    def _recognize_patterns(self, model_data: Dict[str, Any], 
-                           pattern_types: List[str]) -> Dict[str, Any]:
-        """Recognize architecture patterns in the model data."""
+    def _read_model_data_pg(self, model_id: str, domain: str,
+                            element_ids: Optional[List[str]]) -> Dict[str, Any]:
+        """Read the model data through the asyncpg pool without blocking the event loop."""
         try:
-            # Create context for the AI
-            context = {
-                "model": model_data["model"],
-                "elements": model_data["elements"],
-                "relationships": model_data["relationships"],
-                "pattern_types": pattern_types
-            }
-            
-            # Call OpenAI for pattern recognition
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an Enterprise Architecture pattern specialist. Your task is to identify architecture patterns, anti-patterns, and optimization opportunities in enterprise architecture models."},
-                    {"role": "user", "content": f"Identify architecture patterns in this EA model: {json.dumps(context)}"}
-                ],
-                temperature=0.5,
-                max_tokens=2500
+            model, elements, relationships = from_thread.run(
+                _fetch_model_data_pg, self.pg_pool, model_id, element_ids,
+                None if domain == "all" else domain
             )
             
-            analysis_text = response.choices[0].message.content
-            
-            # Parse patterns from the analysis
-            parsed_patterns = self._parse_patterns(analysis_text, pattern_types)
+            if model is None:
+                return {
+                    "success": False,
+                    "message": "Model not found"
+                }
             
             return {
-                "analysis_text": analysis_text,
-                "patterns": parsed_patterns,
-                "pattern_count": sum(len(patterns) for patterns in parsed_patterns.values())
+                "success": True,
+                "model": dict(model),
+                "elements": [dict(element) for element in elements],
+                "relationships": [dict(relationship) for relationship in relationships]
             }
         except Exception as e:
-            logger.error(f"Error recognizing patterns: {str(e)}")
-            raise
+            return {"success": False, "message": str(e)}
     
-    def _parse_patterns(self, analysis_text: str, 
-                       pattern_types: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """Parse architecture patterns from the analysis text."""
-        patterns = {pattern_type: [] for pattern_type in pattern_types}
-        
-        # Call OpenAI again to structure the results
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a parser that extracts structured information about architecture patterns from text. Extract and structure the information into a JSON format with pattern name, description, affected elements, and recommendations."},
-                {"role": "user", "content": f"Parse the following architecture pattern analysis into structured data for pattern types {', '.join(pattern_types)}:\n\n{analysis_text}"}
-            ],
-            temperature=0.2,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
-        )
+    def batch_execute(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run many pattern recognitions as one OpenAI batch job.
         
-        try:
-            # Try to parse the structured JSON response
-            parsed_data = json.loads(response.choices[0].message.content)
-            
-            # Check if the response has the expected structure
-            if isinstance(parsed_data, dict):
-                for pattern_type in pattern_types:
-                    if pattern_type in parsed_data and isinstance(parsed_data[pattern_type], list):
-                        patterns[pattern_type] = parsed_data[pattern_type]
-        except json.JSONDecodeError:
-            # Fallback to simple parsing if structured parsing fails
-            logger.warning("JSON parsing failed, falling back to simple parsing")
-            
-            current_type = None
-            current_pattern = {}
-            
-            for line in analysis_text.split('\n'):
-                line = line.strip()
-                
-                # Check for pattern type headers
-                for pattern_type in pattern_types:
-                    if line.lower().startswith(f"{pattern_type.replace('_', ' ')}:") or line.lower() == pattern_type.replace('_', ' '):
-                        current_type = pattern_type
-                        break
-                
-                # If line is a pattern name (usually short, ends with colon)
-                if current_type and line.endswith(':') and 3 < len(line) < 50 and not any(p.lower() in line.lower() for p in ["summary", "conclusion", "overview"]):
-                    # Save previous pattern if it exists
-                    if current_pattern and "name" in current_pattern:
-                        patterns[current_type].append(current_pattern)
-                    
-                    # Start new pattern
-                    current_pattern = {"name": line[:-1], "description": ""}
+        Intended for non-interactive scans; blocks until the batch completes.
+        
+        Args:
+            requests: Keyword arguments for execute(), one dict per model
+            
+        Returns:
+            One execute()-shaped result per request, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = []
+        
+        for index, request in enumerate(requests):
+            try:
+                args = _validate_args(request, _PatternRecognitionArgs)
+            except msgspec.ValidationError as e:
+                results[index] = {"success": False, "message": f"Invalid arguments: {e}"}
+                continue
+            model_id, domain, pattern_types = args.model_id, args.domain, args.pattern_types
+            
+            model_data = self._gather_model_data(model_id, domain, args.element_ids)
+            if not model_data.get("success", False):
+                results[index] = model_data
+                continue
+            
+            if len(model_data["elements"]) < MIN_PATTERN_ELEMENTS:
+                patterns = _no_patterns(pattern_types)
+                saved_result = self._save_pattern_recognition(model_id, domain, pattern_types, patterns)
+                results[index] = {
+                    "success": True,
+                    "patterns": patterns,
+                    "result_id": saved_result.get("result_id")
+                }
+                continue
+            
+            pending.append((index, model_id, domain, pattern_types, model_data))
+        
+        # Each request carries its own response schema, so submit one batch per schema
+        by_schema: Dict[Tuple[str, ...], list] = {}
+        for entry in pending:
+            by_schema.setdefault(tuple(entry[3]), []).append(entry)
+        
+        for pattern_types, entries in by_schema.items():
+            try:
+                structured_texts = submit_batch(
+                    [
+                        self._pattern_recognition_messages(model_data, list(pattern_types))
+                        for *_, model_data in entries
+                    ],
+                    model=CHAT_MODEL,
+                    response_format=_pattern_response_format(list(pattern_types)),
+                    **_PATTERN_RECOGNITION_PARAMS
+                )
+            except Exception as e:
+                logger.error(f"Error in pattern recognition batch: {str(e)}")
+                continue
+            
+            for (index, model_id, domain, _, _), structured_text in zip(entries, structured_texts):
+                if structured_text is None:
+                    continue
                 
-                # Add content to current pattern
-                elif current_type and current_pattern and "name" in current_pattern:
-                    if "description" not in current_pattern:
-                        current_pattern["description"] = line
-                    else:
-                        current_pattern["description"] += "\n" + line
+                patterns = self._read_patterns(structured_text, list(pattern_types))
+                if patterns is None:
+                    continue
+                saved_result = self._save_pattern_recognition(
+                    model_id, domain, list(pattern_types), patterns
+                )
+                results[index] = {
+                    "success": True,
+                    "patterns": patterns,
+                    "result_id": saved_result.get("result_id")
+                }
+        
+        return [
+            result or {"success": False, "message": "Pattern recognition batch request failed"}
+            for result in results
+        ]
+    
+    def _pattern_recognition_messages(self, model_data: Dict[str, Any],
+                                      pattern_types: List[str]) -> List[Dict[str, str]]:
+        """Build the pattern recognition prompt."""
+        # Create context for the AI
+        context = {
+            "model": model_data["model"],
+            "elements": [_project(element, _PROMPT_ELEMENT_KEYS) for element in model_data["elements"]],
+            "relationships": model_data["relationships"],
+            "pattern_types": pattern_types
+        }
+        
+        return [
+            {"role": "system", "content": "You are an Enterprise Architecture pattern specialist. Your task is to identify architecture patterns, anti-patterns, and optimization opportunities in enterprise architecture models. Summarize your analysis, then list the patterns found for each requested pattern type with their affected elements and recommendations."},
+            {"role": "user", "content": f"Identify architecture patterns in this EA model: {_dumps(context)}"}
+        ]
+    
+    async def _recognize_patterns(self, model_data: Dict[str, Any], 
+                                 pattern_types: List[str], domain: str = "all") -> Dict[str, Any]:
+        """Recognize architecture patterns in the model data."""
+        # Too few elements to form a pattern
+        if len(model_data["elements"]) < MIN_PATTERN_ELEMENTS:
+            return _no_patterns(pattern_types)
+        
+        try:
+            messages = self._pattern_recognition_messages(model_data, pattern_types)
+            
+            # Call OpenAI for structured patterns unless an equivalent result is cached.
+            # Near matches are limited to the same model, domain, pattern types and
+            # graph contents, and compare only the model's elements
+            graph = _graph_fingerprint(model_data["elements"], model_data["relationships"])
+            cache = self.recognition_cache.scoped(
+                f"{model_data['model']['id']}:{domain}:{','.join(sorted(pattern_types))}:{graph}"
+            )
+            structured_text = await cache.get_or_compute(
+                messages,
+                lambda: _acompletion_text(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    response_format=_pattern_response_format(pattern_types),
+                    **_PATTERN_RECOGNITION_PARAMS
+                ),
+                embedding_text=_pattern_embedding_text(model_data, pattern_types),
+                accept=lambda text: self._read_patterns(text, pattern_types) is not None
+            )
             
-            # Add the last pattern
-            if current_type and current_pattern and "name" in current_pattern:
-                patterns[current_type].append(current_pattern)
+            patterns = self._read_patterns(structured_text, pattern_types)
+            if patterns is None:
+                raise ValueError("Pattern recognition response is missing requested pattern types")
+            return patterns
+        except Exception as e:
+            logger.error(f"Error recognizing patterns: {str(e)}")
+            raise
+    
+    def _read_patterns(self, structured_text: str, pattern_types: List[str]) -> Optional[Dict[str, Any]]:
+        """Read a structured pattern recognition response.
         
-        return patterns
+        Returns None when the response does not cover every requested pattern type.
+        """
+        parsed_data = orjson.loads(structured_text)
+        if "summary" not in parsed_data or any(
+            pattern_type not in parsed_data for pattern_type in pattern_types
+        ):
+            return None
+        patterns = {pattern_type: parsed_data[pattern_type] for pattern_type in pattern_types}
+        
+        return {
+            "analysis_text": parsed_data["summary"],
+            "patterns": patterns,
+            "pattern_count": sum(len(found) for found in patterns.values())
+        }
     
     def _save_pattern_recognition(self, model_id: str, domain: str,
                                  pattern_types: List[str], 
@@ -1083,21 +2083,17 @@ class PatternRecognitionTool(Tool):
                 "domain": domain,
                 "pattern_types": pattern_types,
                 "patterns": patterns,
-                "created_at": datetime.now().isoformat()
+                "created_at": datetime.now(timezone.utc).isoformat()
             }
             
-            result = self.supabase.table("ea_pattern_recognition").insert(result_data).execute()
+            # The ID is assigned here so the insert can finish in the background
+            result_data["id"] = str(uuid.uuid4())
+            _insert_in_background(self.supabase, "ea_pattern_recognition", result_data)
             
-            if result.data and len(result.data) > 0:
-                return {
-                    "success": True,
-                    "result_id": result.data[0]["id"]
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": "Failed to save pattern recognition results"
-                }
+            return {
+                "success": True,
+                "result_id": result_data["id"]
+            }
         except Exception as e:
             logger.error(f"Error saving pattern recognition results: {str(e)}")
             return {"success": False, "message": str(e)}
@@ -1107,21 +2103,35 @@ class PatternRecognitionTool(Tool):
 class EnterpriseArchitectureAgent:
     """Master agent for Enterprise Architecture guidance."""
     
-    def __init__(self, supabase_client):
-        """Initialize the Enterprise Architecture Agent."""
+    def __init__(self, supabase_client, pg_pool=None):
+        """Initialize the Enterprise Architecture Agent.
+        
+        Args:
+            supabase_client: A configured Supabase client
+            pg_pool: Optional shared asyncpg pool for the tools' repository reads
+        """
         self.supabase = supabase_client
         
         # Initialize tools
-        self.element_tool = ElementTool(supabase_client)
+        self.element_tool = ElementTool(supabase_client, pg_pool)
         self.documentation_tool = DocumentationTool(supabase_client)
-        self.impact_analysis_tool = ImpactAnalysisTool(supabase_client)
-        self.pattern_recognition_tool = PatternRecognitionTool(supabase_client)
+        self.impact_analysis_tool = ImpactAnalysisTool(supabase_client, pg_pool)
+        self.pattern_recognition_tool = PatternRecognitionTool(supabase_client, pg_pool)
+        self.tools = {
+            tool.name: tool
+            for tool in (
+                self.element_tool,
+                self.documentation_tool,
+                self.impact_analysis_tool,
+                self.pattern_recognition_tool,
+            )
+        }
         
         # Define the agent
         self.agent = Agent(
             name="Enterprise Architecture Guide",
             description="An expert in enterprise architecture that helps with modeling, analysis, and documentation",
-            tools=[self.element_tool, self.documentation_tool, self.impact_analysis_tool, self.pattern_recognition_tool],
+            tools=list(self.tools.values()),
             steps=[
                 Step(
                     name="understand_request",
@@ -1142,11 +2152,54 @@ class EnterpriseArchitectureAgent:
             ]
         )
     
-    def process_request(self, query: str) -> Dict[str, Any]:
-        """Process a user request about enterprise architecture."""
+    def process_request(self, query: str,
+                        context_calls: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+                        background_calls: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """Process a user request about enterprise architecture.
+        
+        For synchronous callers; the request runs on a shared background event loop.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.aprocess_request(query, context_calls, background_calls), _sync_event_loop()
+        ).result()
+    
+    async def aprocess_request(self, query: str,
+                               context_calls: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+                               background_calls: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """Process a user request from a running event loop.
+        
+        The agent runs in a worker thread so its tools can hand OpenAI calls
+        back to this loop.
+        
+        Args:
+            query: The user's request
+            context_calls: Optional independent (tool name, arguments) calls whose
+                results are gathered concurrently and given to the agent as context
+            background_calls: Optional (tool name, arguments) calls the answer does not
+                depend on; they run while the agent works and their results are returned
+            
+        Returns:
+            Dict with the agent response, its final output and any background tool results
+        """
+        # Started first so they overlap with context gathering and the agent run
+        background = [self.start_tool(name, arguments) for name, arguments in background_calls or ()]
+        
         try:
+            messages = [{"role": "user", "content": query}]
+            
+            # Gather known context up front instead of one tool call per agent step
+            if context_calls:
+                results = await self.execute_tools(context_calls)
+                messages.insert(0, {
+                    "role": "system",
+                    "content": "Architecture context gathered for this request: " + _dumps([
+                        {"tool": name, "arguments": arguments, "result": result}
+                        for (name, arguments), result in zip(context_calls, results)
+                    ])
+                })
+            
             # Run the agent
-            response = run(self.agent, [{"role": "user", "content": query}])
+            response = await to_thread.run_sync(run, self.agent, messages)
             
             # Log the interaction
             self._log_interaction(query, response)
@@ -1154,38 +2207,93 @@ class EnterpriseArchitectureAgent:
             return {
                 "success": True,
                 "response": response,
-                "final_output": response.final_output
+                "final_output": response.final_output,
+                "tool_results": await asyncio.gather(*background)
             }
         except Exception as e:
             logger.error(f"Error processing EA request: {str(e)}")
+            for task in background:
+                task.cancel()
             return {
                 "success": False,
                 "message": f"Error processing request: {str(e)}"
             }
     
+    def start_tool(self, name: str, arguments: Dict[str, Any]) -> "asyncio.Task[Dict[str, Any]]":
+        """Start a tool call without waiting for it.
+        
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+            
+        Returns:
+            A task to await only when the result is needed
+        """
+        return asyncio.create_task(self._execute_tool(name, arguments))
+    
+    async def execute_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Execute independent tool calls concurrently.
+        
+        Args:
+            calls: (tool name, arguments) pairs
+            
+        Returns:
+            One tool result per call, in order; a failed call yields an error result
+        """
+        return await asyncio.gather(*(self._execute_tool(name, arguments) for name, arguments in calls))
+    
+    async def _execute_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one tool call in a worker thread, turning failures into error results."""
+        tool = self.tools.get(name)
+        if tool is None:
+            return {"success": False, "message": f"Unknown tool: {name}"}
+        
+        try:
+            return await to_thread.run_sync(lambda: tool.execute(**arguments))
+        except Exception as e:
+            logger.error(f"Error executing {name}: {str(e)}")
+            return {"success": False, "message": str(e)}
+    
     def _log_interaction(self, query: str, response: Any):
         """Log the interaction with the EA agent."""
         try:
             log_data = {
                 "query": query,
                 "response_summary": response.final_output[:500] if hasattr(response, 'final_output') else str(response)[:500],
-                "created_at": datetime.now().isoformat()
+                "created_at": datetime.now(timezone.utc).isoformat()
             }
             
-            self.supabase.table("ea_agent_interactions").insert(log_data).execute()
+            # Queued for a batched insert, so the event loop never waits on Supabase
+            get_activity_log_writer(self.supabase, "ea_agent_interactions").write(log_data)
         except Exception as e:
             logger.error(f"Error logging interaction: {str(e)}")
 
 
+# Helper function to create the EA assistant on an existing Supabase client
+def initialize_ea_assistant(supabase_client, pg_pool=None) -> Agent:
+    """Create the Enterprise Architecture assistant agent.
+    
+    The agent must be run from an AnyIO worker thread so its tools can reach the
+    event loop that owns the pool and the async OpenAI client.
+    """
+    return EnterpriseArchitectureAgent(supabase_client, pg_pool).agent
+
+
+@lru_cache(maxsize=4)
+def _get_supabase(supabase_url: str, supabase_key: str):
+    """Get a shared Supabase client for a project URL and key."""
+    from supabase import create_client
+    return create_client(supabase_url, supabase_key)
+
+
 # Helper function to initialize the Enterprise Architecture GenAI system
 def initialize_ea_genai(supabase_url: str, supabase_key: str, openai_api_key: str):
     """Initialize the Enterprise Architecture GenAI system."""
     # Set up OpenAI API key
     os.environ["OPENAI_API_KEY"] = openai_api_key
     
-    # Initialize Supabase client
-    from supabase import create_client
-    supabase = create_client(supabase_url, supabase_key)
+    # Reuse the Supabase client for this project across calls
+    supabase = _get_supabase(supabase_url, supabase_key)
     
     # Create the EA Agent
     ea_agent = EnterpriseArchitectureAgent(supabase)
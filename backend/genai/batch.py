@@ -0,0 +1,114 @@
+"""
+Enterprise Architecture Solution - OpenAI Batch Jobs
+
+This module submits bulk chat completions through the OpenAI Batch API. Batch
+jobs trade latency for half the per-token cost and a separate rate limit pool,
+which suits non-interactive workloads such as scheduled impact or pattern scans.
+"""
+
+import io
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from .clients import get_openai_client
+
+logger = logging.getLogger(__name__)
+
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = 30.0
+
+# Batch states after which the job will not make further progress
+_TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+def _batch_jsonl(messages_list: List[List[Dict[str, str]]], model: str,
+                 params: Dict[str, Any]) -> bytes:
+    """Serialize one chat completion request per line.
+
+    Args:
+        messages_list: Chat messages for each request
+        model: Model identifier
+        params: Extra completion parameters shared by every request
+
+    Returns:
+        JSONL payload for the Files API
+    """
+    return b"".join(
+        orjson.dumps({
+            "custom_id": str(index),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": messages, **params},
+        }) + b"\n"
+        for index, messages in enumerate(messages_list)
+    )
+
+def wait_for_batch(batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL):
+    """Poll a batch job until it reaches a terminal state.
+
+    Args:
+        batch_id: ID of the batch job
+        poll_interval: Seconds between status checks
+
+    Returns:
+        The final batch object
+    """
+    client = get_openai_client()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in _TERMINAL_STATES:
+            return batch
+        logger.debug(f"Batch {batch_id} is {batch.status}")
+        time.sleep(poll_interval)
+
+def submit_batch(messages_list: List[List[Dict[str, str]]], model: str = "gpt-4o",
+                 poll_interval: float = BATCH_POLL_INTERVAL,
+                 **params: Any) -> List[Optional[str]]:
+    """Run chat completions as one Batch API job and wait for the results.
+
+    Args:
+        messages_list: Chat messages for each request
+        model: Model identifier
+        poll_interval: Seconds between status checks
+        **params: Extra completion parameters shared by every request
+
+    Returns:
+        Completion text for each request, in input order; None where a request failed
+    """
+    if not messages_list:
+        return []
+
+    client = get_openai_client()
+    batch_file = client.files.create(
+        file=("batch.jsonl", io.BytesIO(_batch_jsonl(messages_list, model, params))),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=BATCH_COMPLETION_WINDOW,
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(messages_list)} requests")
+
+    batch = wait_for_batch(batch.id, poll_interval)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+    results: List[Optional[str]] = [None] * len(messages_list)
+    if batch.output_file_id is None:
+        return results
+
+    output = client.files.content(batch.output_file_id)
+    for line in output.text.splitlines():
+        if not line:
+            continue
+        item = orjson.loads(line)
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.error(f"Batch request {item['custom_id']} failed: {item.get('error')}")
+            continue
+        results[int(item["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+
+    return results
@@ -0,0 +1,139 @@
+"""
+Enterprise Architecture Solution - GenAI Result Cache
+
+This module provides in-process TTL caches for GenAI results. Cached entries are
+tagged with the element and model IDs they were derived from so that write paths
+can evict them when the underlying architecture changes.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Hashable, Iterable, Optional
+
+import orjson
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """Thread-safe TTL cache with tag-based invalidation."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of cached results
+            ttl: Time-to-live of each result in seconds
+        """
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Tag index expires on the same schedule so it stays bounded
+        self._tags = TTLCache(maxsize=maxsize * 4, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached result.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached result or None if missing or expired
+        """
+        with self._lock:
+            return self._results.get(key)
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()):
+        """Store a result in the cache.
+
+        Args:
+            key: Cache key
+            value: Result to cache
+            tags: IDs the result depends on, used for invalidation
+        """
+        with self._lock:
+            self._results[key] = value
+            for tag in tags:
+                if not tag:
+                    continue
+                keys = self._tags.get(tag) or set()
+                keys.add(key)
+                self._tags[tag] = keys
+
+    def invalidate(self, tag: str) -> int:
+        """Evict every result tagged with the given ID.
+
+        Args:
+            tag: Element or model ID
+
+        Returns:
+            Number of results evicted
+        """
+        with self._lock:
+            keys = self._tags.pop(tag, None) or set()
+            return sum(1 for key in keys if self._results.pop(key, None) is not None)
+
+    def clear(self):
+        """Remove all cached results."""
+        with self._lock:
+            self._results.clear()
+            self._tags.clear()
+
+
+# Shared caches for the GenAI service
+documentation_cache = ResultCache(maxsize=256, ttl=300)
+impact_analysis_cache = ResultCache(maxsize=256, ttl=60)
+pattern_recognition_cache = ResultCache(maxsize=128, ttl=120)
+
+# Completions made by the agent tools, keyed by prompt. Lifetimes follow how
+# quickly each kind of answer goes stale.
+recommendation_cache = ResultCache(maxsize=512, ttl=24 * 3600)
+element_analysis_cache = ResultCache(maxsize=512, ttl=3600)
+artifact_documentation_cache = ResultCache(maxsize=256, ttl=7 * 24 * 3600)
+
+# Repository reads repeated across agent steps
+model_data_cache = ResultCache(maxsize=256, ttl=60)
+
+_ALL_CACHES = (
+    documentation_cache,
+    impact_analysis_cache,
+    pattern_recognition_cache,
+    recommendation_cache,
+    element_analysis_cache,
+    artifact_documentation_cache,
+    model_data_cache,
+)
+
+def hash_text(text: str) -> str:
+    """Hash free-form text for use in a cache key.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def prompt_key(model: str, messages: Iterable[dict]) -> str:
+    """Hash a chat completion prompt for use as a cache key.
+    
+    Args:
+        model: Model identifier
+        messages: Chat messages sent to the model
+        
+    Returns:
+        Hex digest of the model and messages
+    """
+    payload = orjson.dumps([model, list(messages)], option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.blake2b(payload, digest_size=32).hexdigest()
+
+def invalidate(tag: str):
+    """Evict cached GenAI results that depend on an element or model.
+
+    Args:
+        tag: Element or model ID that changed
+    """
+    evicted = sum(cache.invalidate(tag) for cache in _ALL_CACHES)
+    if evicted:
+        logger.debug(f"Evicted {evicted} cached GenAI results for {tag}")
@@ -0,0 +1,124 @@
+"""
+Enterprise Architecture Solution - GenAI Clients
+
+This module provides the shared OpenAI clients used by the GenAI features, so that
+agent runs and completions reuse pooled HTTP/2 connection sets instead of
+opening new connections per request.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import weakref
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+import httpx
+from openai import APITimeoutError, AsyncOpenAI, OpenAI, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and timeouts for OpenAI API traffic
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=25)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> OpenAI:
+    """Get the shared OpenAI client.
+
+    Returns:
+        OpenAI client backed by a pooled HTTP/2 connection set
+    """
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.Client(
+            http2=True,
+            limits=OPENAI_HTTP_LIMITS,
+            timeout=OPENAI_HTTP_TIMEOUT,
+        ),
+    )
+
+# Async clients by event loop; their connection pools are bound to the loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get the shared asynchronous OpenAI client for the running event loop.
+
+    Must be called from a running event loop.
+
+    Returns:
+        AsyncOpenAI client backed by a pooled HTTP/2 connection set, without
+        built-in retries
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = _new_async_openai_client()
+    return client
+
+def _new_async_openai_client() -> AsyncOpenAI:
+    """Create an asynchronous OpenAI client with its own connection pool."""
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        # Callers retry rate limits and timeouts themselves, with jittered backoff
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=OPENAI_HTTP_LIMITS,
+            timeout=OPENAI_HTTP_TIMEOUT,
+        ),
+    )
+
+# Bounds concurrent OpenAI requests (rate limits), per event loop since a
+# semaphore cannot be shared between loops
+OPENAI_CONCURRENCY = 20
+_openai_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def openai_slot() -> asyncio.Semaphore:
+    """Get the OpenAI concurrency limit for the running event loop.
+
+    with_openai_retry acquires it for each attempt; callers that keep reading a
+    stream after it opens hold it themselves and pass acquire_slot=False.
+
+    Returns:
+        Semaphore shared by every OpenAI request on this loop
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _openai_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _openai_semaphores[loop] = asyncio.Semaphore(OPENAI_CONCURRENCY)
+    return semaphore
+
+# Backoff for rate-limited or timed-out OpenAI requests
+OPENAI_RETRY_ATTEMPTS = 5
+OPENAI_RETRY_INITIAL_WAIT = 1.0
+OPENAI_RETRY_MAX_WAIT = 30.0
+
+async def with_openai_retry(request: Callable[[], Awaitable[Any]], acquire_slot: bool = True) -> Any:
+    """Await an OpenAI request, retrying rate limits and timeouts.
+
+    Each attempt holds an openai_slot(), released while backing off. Waits grow
+    exponentially with random jitter, so concurrent callers that were throttled
+    together do not retry together.
+
+    Args:
+        request: Coroutine function issuing the request
+        acquire_slot: False when the caller already holds an openai_slot()
+
+    Returns:
+        The request's result
+    """
+    for attempt in range(OPENAI_RETRY_ATTEMPTS):
+        try:
+            if not acquire_slot:
+                return await request()
+            async with openai_slot():
+                return await request()
+        except (RateLimitError, APITimeoutError) as e:
+            if attempt == OPENAI_RETRY_ATTEMPTS - 1:
+                raise
+            delay = min(OPENAI_RETRY_INITIAL_WAIT * 2 ** attempt, OPENAI_RETRY_MAX_WAIT)
+            delay += random.uniform(0, OPENAI_RETRY_INITIAL_WAIT)
+            logger.warning(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -5,34 +5,152 @@ This module implements the AI-powered documentation generation capabilities
 for the Enterprise Architecture Solution using OpenAI's GPT models.
 """
 
-import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
-import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime
 
-from openai import OpenAI
+import cmarkgfm
+import orjson
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from . import queries
+from .activity_log import get_activity_log_writer
+from .clients import get_async_openai_client, openai_slot, with_openai_retry
+from .prompts import EA_SYSTEM_PREFIX
+from .semantic_cache import canonical_json
+
+# Logging is configured by the application entrypoint
 logger = logging.getLogger(__name__)
 
+# Documents generated at once by generate_documentation_batch (OpenAI rate limits)
+DOCUMENTATION_BATCH_CONCURRENCY = 8
+
+# Chat model by documentation style; templated styles use the light model
+_DOCUMENTATION_MODELS = {
+    "technical": "gpt-4o-mini",
+    "business": "gpt-4o-mini",
+    "executive": "gpt-4o",
+}
+_DEFAULT_DOCUMENTATION_MODEL = "gpt-4o-mini"
+
+# Completion token budget by documentation style (executive summaries are short)
+_DOCUMENTATION_MAX_TOKENS = {"executive": 600}
+_DEFAULT_DOCUMENTATION_MAX_TOKENS = 2000
+
+# Styles that rarely need relationships; they are not fetched unless requested
+_STYLES_WITHOUT_RELATIONSHIPS = {"executive"}
+
+# Content types whose prompt reflects the stored artifact, so their documentation
+# can be kept by prompt fingerprint; the others are still placeholders
+_PERSISTED_CONTENT_TYPES = {"element"}
+
+def _completion_params(style: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """Get the completion parameters for a documentation style.
+    
+    Args:
+        style: Documentation style
+        model: Optional chat model overriding the style's default
+        
+    Returns:
+        Model, temperature and token budget for the completion
+    """
+    return {
+        "model": model or _DOCUMENTATION_MODELS.get(style, _DEFAULT_DOCUMENTATION_MODEL),
+        "temperature": 0.7,
+        "max_tokens": _DOCUMENTATION_MAX_TOKENS.get(style, _DEFAULT_DOCUMENTATION_MAX_TOKENS),
+    }
+
+def _log_prompt_cache_usage(model: str, usage: Any):
+    """Log how much of a completion's prompt was served from OpenAI's prefix cache."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens") or 0
+    else:
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    logger.info(f"Documentation completion on {model}: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached")
+
+# Runs generation logging and documentation storage off the request path
+_log_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ea-doc-log")
+
+# Every style's sections and every format's instructions live in the system
+# message, so it is identical across requests and OpenAI can reuse its cached
+# prefix; only the artifact, style and format go in the user message
+_DOCUMENTATION_SYSTEM_MESSAGE = {"role": "system", "content": EA_SYSTEM_PREFIX + """
+
+# Task
+
+You are acting as an expert enterprise architecture documentation writer. Your job is to create clear, well-structured documentation based on the provided information. The user message names the documentation style and output format, then describes the artifact to document.
+
+## Documentation styles
+
+- technical: technical documentation with the sections 1. Overview, 2. Technical Details, 3. Relationships and Dependencies, 4. Implementation Considerations.
+- business: business-focused documentation with the sections 1. Business Purpose, 2. Value Proposition, 3. Stakeholders, 4. Business Processes Supported.
+- executive: an executive summary with the sections 1. Strategic Value, 2. Key Benefits, 3. Investment and ROI, 4. Key Recommendations.
+- any other style: general documentation with sections suited to the artifact.
+
+## Output formats
+
+- markdown: format the documentation in Markdown.
+- html: format the documentation in HTML.
+- any other format: no particular markup is required."""}
+
+# Element prompt opening for each style; the style's sections are in the system message
+_ELEMENT_PROMPT_TEMPLATES = {
+    "technical": "Please create technical documentation for the {type} '{name}'.\n\nDescription: {description}",
+    "business": "Please create business-focused documentation for the {type} '{name}'.\n\nDescription: {description}",
+    "executive": "Please create an executive summary for the {type} '{name}'.\n\nDescription: {description}",
+}
+_DEFAULT_ELEMENT_PROMPT_TEMPLATE = "Please create documentation for the {type} '{name}'.\n\nDescription: {description}"
+
+# Page wrapped around documentation converted from Markdown to HTML
+_HTML_SHELL = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>EA Documentation</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 20px; }}
+        h1 {{ color: #2c3e50; }}
+        h2 {{ color: #3498db; }}
+        h3 {{ color: #2980b9; }}
+        pre {{ background-color: #f5f5f5; padding: 10px; border-radius: 5px; }}
+        code {{ background-color: #f5f5f5; padding: 2px 5px; border-radius: 3px; }}
+    </style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
 class DocumentationGenerator:
     """Generate documentation from EA models and elements."""
     
-    def __init__(self, supabase_client):
+    __slots__ = ("supabase", "pg_pool", "_user_id", "_inflight")
+    
+    def __init__(self, supabase_client, pg_pool, user_id: Optional[str] = None):
         """Initialize the Documentation Generator.
         
         Args:
-            supabase_client: A configured Supabase client for database operations
+            supabase_client: A configured Supabase client for database writes
+            pg_pool: Shared asyncpg pool for reading the EA repository
+            user_id: ID of the user generations are logged for; looked up from
+                the Supabase session on first use when not given
         """
         self.supabase = supabase_client
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.pg_pool = pg_pool
+        self._user_id = user_id
+        # Generations in progress by prompt context, shared by identical concurrent requests
+        self._inflight: Dict[str, asyncio.Future] = {}
         
-    def generate_documentation(self, content_type: str, content_id: str, 
+    async def generate_documentation(self, content_type: str, content_id: str, 
                               format: str = "markdown", include_diagrams: bool = True,
-                              include_relationships: bool = True, 
-                              style: str = "technical") -> Dict[str, Any]:
+                              include_relationships: Optional[bool] = None, 
+                              style: str = "technical",
+                              model: Optional[str] = None) -> Dict[str, Any]:
         """Generate documentation for EA artifacts.
         
         Args:
@@ -40,33 +158,31 @@ class DocumentationGenerator:
             content_id: UUID of the content
             format: Output format (markdown, html, docx)
             include_diagrams: Whether to include diagrams
-            include_relationships: Whether to include relationships
+            include_relationships: Whether to include relationships; defaults to
+                False for the executive style and True otherwise
             style: Style of documentation (technical, business, executive)
+            model: Optional chat model overriding the style's default
             
         Returns:
             Dict containing the generated documentation and metadata
         """
+        if include_relationships is None:
+            include_relationships = style not in _STYLES_WITHOUT_RELATIONSHIPS
+        
         try:
             # Get content data based on type
-            if content_type == "element":
-                content_data = self._get_element_data(content_id, include_relationships)
-            elif content_type == "model":
-                content_data = self._get_model_data(content_id, include_diagrams, include_relationships)
-            elif content_type == "view":
-                content_data = self._get_view_data(content_id)
-            elif content_type == "policy":
-                content_data = self._get_policy_data(content_id)
-            else:
-                return {"success": False, "error": f"Unsupported content type: {content_type}"}
+            content_data = await self._get_content_data(content_type, content_id, include_diagrams, include_relationships)
                 
             # Generate documentation using OpenAI
-            documentation = self._generate_with_ai(content_data, content_type, format, style)
+            documentation = await self._generate_with_ai(
+                content_data, content_type, content_id, format, style, model
+            )
             
             # Format according to requested output type
             formatted_doc = self._format_documentation(documentation, format)
             
-            # Log the documentation generation
-            self._log_generation(content_type, content_id, format, style)
+            # Log the documentation generation without waiting for it
+            _log_executor.submit(self._log_generation, content_type, content_id, format, style)
             
             return {
                 "success": True,
@@ -84,59 +200,113 @@ class DocumentationGenerator:
             logger.error(f"Error generating documentation: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def _get_element_data(self, element_id: str, include_relationships: bool) -> Dict[str, Any]:
-        """Get element data from the database.
+    async def generate_documentation_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Generate documentation for several EA artifacts concurrently.
+        
+        Items are started grouped by content type, style and format, so requests
+        sharing the longest prompt prefix reach OpenAI back to back while the
+        provider's prefix cache is warm.
         
         Args:
-            element_id: ID of the element
-            include_relationships: Whether to include related elements
+            items: Keyword arguments for generate_documentation, one dict per document
             
         Returns:
-            Element data dictionary
+            One generate_documentation result per item, in order
         """
-        # Query the element table
-        element_query = self.supabase.table("ea_elements").select("*").eq("id", element_id).execute()
+        semaphore = asyncio.Semaphore(DOCUMENTATION_BATCH_CONCURRENCY)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
         
-        if not element_query.data:
-            raise ValueError(f"Element with ID {element_id} not found")
+        async def generate(index: int, item: Dict[str, Any]):
+            async with semaphore:
+                results[index] = await self.generate_documentation(**item)
+        
+        # Tasks take semaphore slots in the order they start
+        order = sorted(range(len(items)), key=lambda index: (
+            items[index]["content_type"],
+            items[index].get("style", "technical"),
+            items[index].get("format", "markdown"),
+        ))
+        await asyncio.gather(*(generate(index, items[index]) for index in order))
+        return results
+    
+    async def stream_documentation(self, content_type: str, content_id: str, 
+                                   format: str = "markdown", include_diagrams: bool = True,
+                                   include_relationships: Optional[bool] = None, 
+                                   style: str = "technical",
+                                   model: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream documentation for EA artifacts as the model generates it.
+        
+        The content is looked up before returning, so missing content raises here
+        rather than part-way through the stream.
+        
+        Args:
+            content_type: Type of content (element, model, view, policy)
+            content_id: UUID of the content
+            format: Output format (markdown, html)
+            include_diagrams: Whether to include diagrams
+            include_relationships: Whether to include relationships; defaults to
+                False for the executive style and True otherwise
+            style: Style of documentation (technical, business, executive)
+            model: Optional chat model overriding the style's default
             
-        element = element_query.data[0]
+        Returns:
+            Async iterator over chunks of generated documentation text
+        """
+        if format not in ("markdown", "html"):
+            raise ValueError(f"Streaming is not supported for format: {format}")
+        if include_relationships is None:
+            include_relationships = style not in _STYLES_WITHOUT_RELATIONSHIPS
         
-        # Get element type information
-        element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", element["type_id"]).execute()
-        element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown"}
+        content_data = await self._get_content_data(content_type, content_id, include_diagrams, include_relationships)
+        prompt = self._build_prompt(content_data, content_type, format, style)
         
-        # Get model information
-        model_query = self.supabase.table("ea_models").select("*").eq("id", element["model_id"]).execute()
-        model = model_query.data[0] if model_query.data else {"name": "Unknown"}
+        return self._stream_with_ai(prompt, content_type, content_id, format, style, model)
+
+    async def _get_content_data(self, content_type: str, content_id: str,
+                          include_diagrams: bool, include_relationships: bool) -> Dict[str, Any]:
+        """Get content data for a supported content type.
         
-        # If we need relationships, get them
-        relationships = []
-        if include_relationships:
-            # Get relationships where this element is the source
-            source_rels_query = self.supabase.table("ea_relationships").select("*").eq("source_element_id", element_id).execute()
-            source_rels = source_rels_query.data if source_rels_query.data else []
+        Args:
+            content_type: Type of content (element, model, view, policy)
+            content_id: ID of the content
+            include_diagrams: Whether to include diagrams
+            include_relationships: Whether to include relationships
             
-            # Get relationships where this element is the target
-            target_rels_query = self.supabase.table("ea_relationships").select("*").eq("target_element_id", element_id).execute()
-            target_rels = target_rels_query.data if target_rels_query.data else []
+        Returns:
+            Content data dictionary
+        """
+        if content_type == "element":
+            return await self._get_element_data(content_id, include_relationships)
+        elif content_type == "model":
+            return await self._get_model_data(content_id, include_diagrams, include_relationships)
+        elif content_type == "view":
+            return await self._get_view_data(content_id)
+        elif content_type == "policy":
+            return await self._get_policy_data(content_id)
+        else:
+            raise ValueError(f"Unsupported content type: {content_type}")
+
+    async def _get_element_data(self, element_id: str, include_relationships: bool) -> Dict[str, Any]:
+        """Get element data from the database.
+        
+        Args:
+            element_id: ID of the element
+            include_relationships: Whether to include related elements
             
-            # Combine and process relationships
-            for rel in source_rels + target_rels:
-                rel_type_query = self.supabase.table("ea_relationship_types").select("*").eq("id", rel["relationship_type_id"]).execute()
-                rel_type = rel_type_query.data[0] if rel_type_query.data else {"name": "Unknown"}
-                
-                # Get the other element in the relationship
-                other_id = rel["target_element_id"] if rel["source_element_id"] == element_id else rel["source_element_id"]
-                other_element_query = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-                other_element = other_element_query.data[0] if other_element_query.data else {"name": "Unknown"}
-                
-                relationships.append({
-                    "relationship_type": rel_type["name"],
-                    "element_name": other_element["name"],
-                    "element_type": "Unknown",  # We could get this if needed
-                    "direction": "outgoing" if rel["source_element_id"] == element_id else "incoming"
-                })
+        Returns:
+            Element data dictionary
+        """
+        # One statement returns the element, its type and model, and its
+        # relationships with the other side's name and type already resolved
+        if include_relationships:
+            element = await self.pg_pool.fetchrow(queries.ELEMENT_WITH_RELATIONSHIPS, element_id)
+        else:
+            element = await self.pg_pool.fetchrow(queries.ELEMENT_DETAILS, element_id)
+        
+        if element is None:
+            raise ValueError(f"Element with ID {element_id} not found")
+        
+        relationships = element["relationships"] if include_relationships else []
         
         # Compile all data
         element_data = {
@@ -144,17 +314,17 @@ class DocumentationGenerator:
                 "id": element["id"],
                 "name": element["name"],
                 "description": element["description"],
-                "type": element_type["name"],
+                "type": element["type"],
                 "status": element["status"],
                 "properties": element["properties"],
-                "model": model["name"],
+                "model": element["model"],
                 "relationships": relationships
             }
         }
         
         return element_data
 
-    def _get_model_data(self, model_id: str, include_diagrams: bool, include_relationships: bool) -> Dict[str, Any]:
+    async def _get_model_data(self, model_id: str, include_diagrams: bool, include_relationships: bool) -> Dict[str, Any]:
         """Get model data from the database.
         
         Args:
@@ -170,7 +340,7 @@ class DocumentationGenerator:
         # For now, return a placeholder
         return {"model": {"id": model_id, "name": "Model Name"}}
 
-    def _get_view_data(self, view_id: str) -> Dict[str, Any]:
+    async def _get_view_data(self, view_id: str) -> Dict[str, Any]:
         """Get view data from the database.
         
         Args:
@@ -184,7 +354,7 @@ class DocumentationGenerator:
         # For now, return a placeholder
         return {"view": {"id": view_id, "name": "View Name"}}
 
-    def _get_policy_data(self, policy_id: str) -> Dict[str, Any]:
+    async def _get_policy_data(self, policy_id: str) -> Dict[str, Any]:
         """Get policy data from the database.
         
         Args:
@@ -198,9 +368,9 @@ class DocumentationGenerator:
         # For now, return a placeholder
         return {"policy": {"id": policy_id, "name": "Policy Name"}}
 
-    def _generate_with_ai(self, content_data: Dict[str, Any], content_type: str, 
-                         format: str, style: str) -> str:
-        """Generate documentation using OpenAI.
+    def _build_prompt(self, content_data: Dict[str, Any], content_type: str, 
+                      format: str, style: str) -> str:
+        """Build the documentation prompt for the content.
         
         Args:
             content_data: Content data to document
@@ -209,61 +379,25 @@ class DocumentationGenerator:
             style: Documentation style
             
         Returns:
-            Generated documentation as string
+            Prompt text
         """
         # Create a prompt based on content type and style
         if content_type == "element":
             element = content_data["element"]
             
-            # Build a prompt based on element type and style
-            if style == "technical":
-                prompt = f"""
-                Please create a technical documentation for the {element['type']} '{element['name']}'. 
-                
-                Description: {element.get('description', 'No description provided')}
-                
-                Include the following sections:
-                1. Overview
-                2. Technical Details
-                3. Relationships and Dependencies
-                4. Implementation Considerations
-                """
-            elif style == "business":
-                prompt = f"""
-                Please create a business-focused documentation for the {element['type']} '{element['name']}'. 
-                
-                Description: {element.get('description', 'No description provided')}
-                
-                Include the following sections:
-                1. Business Purpose
-                2. Value Proposition
-                3. Stakeholders
-                4. Business Processes Supported
-                """
-            elif style == "executive":
-                prompt = f"""
-                Please create an executive summary for the {element['type']} '{element['name']}'. 
-                
-                Description: {element.get('description', 'No description provided')}
-                
-                Include the following sections:
-                1. Strategic Value
-                2. Key Benefits
-                3. Investment and ROI
-                4. Key Recommendations
-                """
-            else:
-                prompt = f"""
-                Please create documentation for the {element['type']} '{element['name']}'. 
-                
-                Description: {element.get('description', 'No description provided')}
-                """
+            template = _ELEMENT_PROMPT_TEMPLATES.get(style, _DEFAULT_ELEMENT_PROMPT_TEMPLATE)
+            prompt = template.format(
+                type=element['type'],
+                name=element['name'],
+                description=element.get('description', 'No description provided'),
+            )
             
             # Add relationship information if available
             if element.get('relationships'):
-                prompt += "\n\nRelationships:\n"
-                for rel in element['relationships']:
-                    prompt += f"- {rel['direction'].capitalize()} {rel['relationship_type']} with {rel['element_name']}\n"
+                prompt += "\n\nRelationships:\n" + "\n".join(
+                    f"- {rel['direction'].capitalize()} {rel['relationship_type']} with {rel['element_name']}"
+                    for rel in element['relationships']
+                )
         elif content_type == "model":
             model = content_data["model"]
             prompt = f"Create documentation for the model '{model['name']}'"
@@ -274,27 +408,178 @@ class DocumentationGenerator:
             policy = content_data["policy"]
             prompt = f"Create documentation for the policy '{policy['name']}'"
         else:
-            prompt = f"Create documentation for this content: {json.dumps(content_data)}"
+            # Sorted keys keep the prompt, and so its cache key, stable
+            content_json = orjson.dumps(content_data, option=orjson.OPT_SORT_KEYS, default=str).decode()
+            prompt = f"Create documentation for this content: {content_json}"
+        
+        # Style and format instructions are in the system message
+        return f"Style: {style}\nFormat: {format}\n\n{prompt}"
+
+    async def _generate_with_ai(self, content_data: Dict[str, Any], content_type: str, content_id: str,
+                         format: str, style: str, model: Optional[str] = None) -> str:
+        """Generate documentation using OpenAI.
+        
+        Element documentation is stored persistently by a fingerprint of the full
+        prompt, so an unchanged element is never documented twice. Prompts for
+        other content types do not yet reflect the content, so they are not stored.
+        
+        Args:
+            content_data: Content data to document
+            content_type: Type of content
+            content_id: ID of the content
+            format: Output format
+            style: Documentation style
+            model: Optional chat model overriding the style's default
             
-        # Add format-specific instructions
-        if format == "markdown":
-            prompt += "\n\nPlease format the documentation in Markdown."
-        elif format == "html":
-            prompt += "\n\nPlease format the documentation in HTML."
-        
-        # Get completion from OpenAI
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert enterprise architecture documentation writer. Your job is to create clear, well-structured documentation based on the provided information."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        # Extract and return the documentation
-        return response.choices[0].message.content
+        Returns:
+            Generated documentation as string
+        """
+        prompt = self._build_prompt(content_data, content_type, format, style)
+        messages = [
+            _DOCUMENTATION_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ]
+        
+        params = _completion_params(style, model)
+        context = {"content_type": content_type, "content_id": content_id, "format": format,
+                   "style": style, "model": params["model"], "messages": messages}
+        key = canonical_json(context)
+        fingerprint = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        
+        persistent = content_type in _PERSISTED_CONTENT_TYPES
+        if persistent:
+            documentation = await self._get_stored_documentation(content_id, fingerprint)
+            if documentation is not None:
+                return documentation
+        
+        async def generate() -> str:
+            # Only a real completion is stored under the new fingerprint; a near match
+            # would be documentation for the content before it changed
+            documentation = await self._complete(messages, params)
+            if persistent:
+                _log_executor.submit(
+                    self._store_documentation, content_type, content_id, format, style, fingerprint, documentation
+                )
+            return documentation
+        
+        # Identical concurrent requests wait for the generation already in flight
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(generate())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # A cancelled caller does not cancel the generation for the others
+        return await asyncio.shield(task)
+
+    async def _get_stored_documentation(self, content_id: str, fingerprint: str) -> Optional[str]:
+        """Get stored documentation for content with an unchanged prompt.
+        
+        Args:
+            content_id: ID of the content
+            fingerprint: Fingerprint of the documentation prompt
+            
+        Returns:
+            The stored documentation, or None if there is none or the lookup fails
+        """
+        try:
+            return await self.pg_pool.fetchval(queries.STORED_DOCUMENTATION, content_id, fingerprint)
+        except Exception as e:
+            logger.warning(f"Error reading stored documentation: {str(e)}")
+            return None
+
+    def _store_documentation(self, content_type: str, content_id: str, format: str, style: str,
+                             fingerprint: str, documentation: str):
+        """Store generated documentation, replacing older versions for the same style and format.
+        
+        Args:
+            content_type: Type of content
+            content_id: ID of the content
+            format: Output format
+            style: Documentation style
+            fingerprint: Fingerprint of the documentation prompt
+            documentation: Generated documentation
+        """
+        try:
+            # Documentation for earlier versions of the content will not be requested
+            # again; it is replaced in the same transaction
+            self.supabase.rpc("replace_stored_documentation", {
+                "doc_content_id": content_id,
+                "doc_fingerprint": fingerprint,
+                "doc_content_type": content_type,
+                "doc_format": format,
+                "doc_style": style,
+                "doc_documentation": documentation,
+            }).execute()
+        except Exception as e:
+            logger.error(f"Error storing documentation: {str(e)}")
+
+    async def _complete(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        """Get a documentation completion from OpenAI.
+        
+        The completion is streamed so tokens are read as they are generated.
+        
+        Args:
+            messages: Chat messages for the completion
+            params: Completion parameters from _completion_params
+            
+        Returns:
+            Generated documentation as string
+        """
+        return "".join([chunk async for chunk in self._stream_completion(messages, params)])
+
+    async def _stream_completion(self, messages: List[Dict[str, str]],
+                                 params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream a documentation completion from OpenAI.
+        
+        Args:
+            messages: Chat messages for the completion
+            params: Completion parameters from _completion_params
+            
+        Yields:
+            Chunks of generated documentation text
+        """
+        # The concurrency slot is held until the stream is fully read; the shared
+        # client leaves rate-limit and timeout retries to the caller
+        async with openai_slot():
+            stream = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
+                messages=messages,
+                stream=True,
+                # Usage arrives in a final chunk, to measure prompt cache hits
+                extra_body={"stream_options": {"include_usage": True}},
+                **params
+            ), acquire_slot=False)
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None) is not None:
+                    _log_prompt_cache_usage(params["model"], chunk.usage)
+
+    async def _stream_with_ai(self, prompt: str, content_type: str, content_id: str,
+                              format: str, style: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream documentation from OpenAI as it is generated.
+        
+        Args:
+            prompt: Documentation prompt
+            content_type: Type of content
+            content_id: ID of the content
+            format: Output format
+            style: Documentation style
+            model: Optional chat model overriding the style's default
+            
+        Yields:
+            Chunks of generated documentation text
+        """
+        messages = [
+            _DOCUMENTATION_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ]
+        async for chunk in self._stream_completion(messages, _completion_params(style, model)):
+            yield chunk
+        
+        # Log the documentation generation once the stream completes
+        _log_executor.submit(self._log_generation, content_type, content_id, format, style)
 
     def _format_documentation(self, documentation: str, format: str) -> str:
         """Format documentation according to the requested output format.
@@ -314,30 +599,9 @@ class DocumentationGenerator:
             if documentation.strip().startswith("<"):
                 return documentation
             
-            # Otherwise, convert markdown to HTML (simple implementation)
-            # In a real implementation, you would use a proper markdown to HTML converter
-            html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>EA Documentation</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 20px; }}
-                    h1 {{ color: #2c3e50; }}
-                    h2 {{ color: #3498db; }}
-                    h3 {{ color: #2980b9; }}
-                    pre {{ background-color: #f5f5f5; padding: 10px; border-radius: 5px; }}
-                    code {{ background-color: #f5f5f5; padding: 2px 5px; border-radius: 3px; }}
-                </style>
-            </head>
-            <body>
-                {documentation.replace('\n', '<br>')}
-            </body>
-            </html>
-            """
-            return html
+            # Otherwise, convert markdown to HTML (GitHub-flavored, C implementation)
+            body = cmarkgfm.github_flavored_markdown_to_html(documentation)
+            return _HTML_SHELL.format(body=body)
         elif format == "docx":
             # For docx, we would normally use a library like python-docx
             # Here we'll just return a placeholder message
@@ -345,6 +609,15 @@ class DocumentationGenerator:
         else:
             return documentation
 
+    def _current_user_id(self) -> str:
+        """Get the ID of the user generations are logged for.
+        
+        The Supabase auth lookup is an HTTP call, so its result is kept.
+        """
+        if self._user_id is None:
+            self._user_id = self.supabase.auth.get_user().user.id
+        return self._user_id
+
     def _log_generation(self, content_type: str, content_id: str, format: str, style: str):
         """Log documentation generation in the database.
         
@@ -355,18 +628,19 @@ class DocumentationGenerator:
             style: Documentation style
         """
         try:
-            # Insert a record into the ai_generated_content table
-            self.supabase.table("ai_generated_content").insert({
+            # Queue a record for the ai_generated_content table; a background
+            # thread inserts queued records in batches
+            get_activity_log_writer(self.supabase, "ai_generated_content").write({
                 "content_type": "documentation",
                 "prompt": f"Generate {style} documentation in {format} format for {content_type} {content_id}",
-                "created_by": self.supabase.auth.get_user().user.id,  # This would need to be passed in or retrieved
+                "created_by": self._current_user_id(),
                 "properties": {
                     "documentation_type": content_type,
                     "related_id": content_id,
                     "format": format,
                     "style": style
                 }
-            }).execute()
+            })
         except Exception as e:
             logger.error(f"Error logging documentation generation: {str(e)}")
             # Continue even if logging fails
@@ -15,8 +15,6 @@ import openai
 from openai.agents import Agent, Step, Tool, run
 from openai.types import FunctionDefinition
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class GenAIEngine:
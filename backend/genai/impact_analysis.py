@@ -5,31 +5,41 @@ This module implements the AI-powered impact analysis capabilities
 for the Enterprise Architecture Solution using OpenAI's GPT models.
 """
 
-import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 import json
 from datetime import datetime
 
-from openai import OpenAI
+from . import queries
+from .activity_log import get_activity_log_writer
+from .clients import get_async_openai_client, with_openai_retry
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Logs analyses off the request path (the user lookup is an HTTP call)
+_log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ea-impact-log")
+
 class ImpactAnalysis:
     """Analyze the impact of architecture changes."""
     
-    def __init__(self, supabase_client):
+    __slots__ = ("supabase", "pg_pool", "_user_id")
+    
+    def __init__(self, supabase_client, pg_pool, user_id: Optional[str] = None):
         """Initialize the Impact Analysis engine.
         
         Args:
-            supabase_client: A configured Supabase client for database operations
+            supabase_client: A configured Supabase client for database writes
+            pg_pool: Shared asyncpg pool for reading the EA repository
+            user_id: ID of the user analyses are logged for; looked up from
+                the Supabase session on first use when not given
         """
         self.supabase = supabase_client
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.pg_pool = pg_pool
+        self._user_id = user_id
         
-    def analyze_impact(self, element_id: str, change_description: str, 
+    async def analyze_impact(self, element_id: str, change_description: str, 
                      change_type: str, analysis_depth: int = 2) -> Dict[str, Any]:
         """Analyze the impact of a proposed change to an architecture element.
         
@@ -43,18 +53,21 @@ class ImpactAnalysis:
             Dict containing the impact analysis results
         """
         try:
-            # Get element data
-            element_data = self._get_element_data(element_id)
-            
-            # Get related elements based on analysis depth
-            related_elements = self._get_related_elements(element_id, analysis_depth)
+            # Element data and related elements are independent lookups, so run them concurrently
+            element_data, related_elements = await asyncio.gather(
+                self._get_element_data(element_id),
+                self._get_related_elements(element_id, analysis_depth),
+            )
             
             # Perform impact analysis using OpenAI
-            impact_analysis = self._analyze_with_ai(element_data, related_elements, 
-                                                  change_description, change_type)
+            impact_analysis = await self._analyze_with_ai(
+                element_data, related_elements, change_description, change_type
+            )
             
-            # Log the analysis
-            self._log_analysis(element_id, change_description, change_type, analysis_depth)
+            # Log the analysis without waiting for it
+            _log_executor.submit(
+                self._log_analysis, element_id, change_description, change_type, analysis_depth
+            )
             
             return {
                 "success": True,
@@ -71,7 +84,7 @@ class ImpactAnalysis:
             logger.error(f"Error performing impact analysis: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def _get_element_data(self, element_id: str) -> Dict[str, Any]:
+    async def _get_element_data(self, element_id: str) -> Dict[str, Any]:
         """Get element data from the database.
         
         Args:
@@ -80,130 +93,83 @@ class ImpactAnalysis:
         Returns:
             Element data dictionary
         """
-        # Query the element table
-        element_query = self.supabase.table("ea_elements").select("*").eq("id", element_id).execute()
+        # Element, type and model in a single query
+        element = await self.pg_pool.fetchrow(queries.ELEMENT_DETAILS, element_id)
         
-        if not element_query.data:
+        if element is None:
             raise ValueError(f"Element with ID {element_id} not found")
-            
-        element = element_query.data[0]
-        
-        # Get element type information
-        element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", element["type_id"]).execute()
-        element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown"}
         
-        # Get model information
-        model_query = self.supabase.table("ea_models").select("*").eq("id", element["model_id"]).execute()
-        model = model_query.data[0] if model_query.data else {"name": "Unknown"}
-        
-        # Compile element data
-        element_data = {
-            "id": element["id"],
-            "name": element["name"],
-            "description": element["description"],
-            "type": element_type["name"],
-            "status": element["status"],
-            "properties": element["properties"],
-            "model": model["name"]
-        }
-        
-        return element_data
+        return dict(element)
 
-    def _get_related_elements(self, element_id: str, depth: int = 2) -> List[Dict[str, Any]]:
+    async def _get_related_elements(self, element_id: str, depth: int = 2) -> List[Dict[str, Any]]:
         """Get related elements based on analysis depth.
         
+        The graph is walked breadth-first; each depth level is fetched with a single
+        query covering the whole frontier rather than one query per element.
+        
         Args:
             element_id: ID of the element
-            depth: Depth of relationship analysis
+            depth: Depth of relationship analysis (1-3)
             
         Returns:
             List of related elements with relationship information
         """
         related_elements = []
+        seen_ids = {element_id}
         
-        # Level 1: Direct relationships
-        # Get relationships where this element is the source
-        source_rels_query = self.supabase.table("ea_relationships").select("*").eq("source_element_id", element_id).execute()
-        source_rels = source_rels_query.data if source_rels_query.data else []
-        
-        # Get relationships where this element is the target
-        target_rels_query = self.supabase.table("ea_relationships").select("*").eq("target_element_id", element_id).execute()
-        target_rels = target_rels_query.data if target_rels_query.data else []
+        # Level 1: Direct relationships in either direction
+        direct_rels = await self.pg_pool.fetch(queries.RELATIONSHIPS_FOR_ELEMENTS, [element_id])
         
-        # Process direct relationships
-        level1_element_ids = []
-        for rel in source_rels + target_rels:
-            rel_type_query = self.supabase.table("ea_relationship_types").select("*").eq("id", rel["relationship_type_id"]).execute()
-            rel_type = rel_type_query.data[0] if rel_type_query.data else {"name": "Unknown"}
+        frontier = []
+        for rel in direct_rels:
+            outgoing = rel["source_element_id"] == element_id
+            other = "target" if outgoing else "source"
+            other_id = rel[f"{other}_element_id"]
             
-            # Get the other element in the relationship
-            other_id = rel["target_element_id"] if rel["source_element_id"] == element_id else rel["source_element_id"]
-            other_element_query = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
+            related_elements.append({
+                "id": other_id,
+                "name": rel[f"{other}_name"],
+                "type": rel[f"{other}_type"],
+                "relationship": rel["relationship_type"],
+                "direction": "outgoing" if outgoing else "incoming",
+                "level": 1
+            })
             
-            if other_element_query.data:
-                other_element = other_element_query.data[0]
-                element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", other_element["type_id"]).execute()
-                element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown"}
-                
-                related_elements.append({
-                    "id": other_element["id"],
-                    "name": other_element["name"],
-                    "type": element_type["name"],
-                    "relationship": rel_type["name"],
-                    "direction": "outgoing" if rel["source_element_id"] == element_id else "incoming",
-                    "level": 1
-                })
-                
-                level1_element_ids.append(other_id)
-        
-        # If depth is greater than 1, get indirect relationships
-        if depth > 1:
-            # For each directly related element, get its relationships
-            for related_id in level1_element_ids:
-                # Get relationships where this element is the source
-                source_rels_query = self.supabase.table("ea_relationships").select("*").eq("source_element_id", related_id).execute()
-                source_rels = source_rels_query.data if source_rels_query.data else []
-                
-                # Get relationships where this element is the target
-                target_rels_query = self.supabase.table("ea_relationships").select("*").eq("target_element_id", related_id).execute()
-                target_rels = target_rels_query.data if target_rels_query.data else []
-                
-                # Process level 2 relationships
-                for rel in source_rels + target_rels:
-                    # Skip relationships with the original element
-                    if rel["source_element_id"] == element_id or rel["target_element_id"] == element_id:
+            if other_id not in seen_ids:
+                seen_ids.add(other_id)
+                frontier.append(other_id)
+        
+        # Deeper levels: indirect relationships of the previous level's elements
+        for level in range(2, min(depth, 3) + 1):
+            if not frontier:
+                break
+            
+            frontier_set = set(frontier)
+            indirect_rels = await self.pg_pool.fetch(queries.RELATIONSHIPS_FOR_ELEMENTS, frontier)
+            
+            frontier = []
+            for rel in indirect_rels:
+                # Take the far side of the relationship from each frontier endpoint;
+                # elements already seen (including the original) are skipped
+                for related_id, other in ((rel["source_element_id"], "target"), (rel["target_element_id"], "source")):
+                    other_id = rel[f"{other}_element_id"]
+                    if related_id not in frontier_set or other_id in seen_ids:
                         continue
                     
-                    rel_type_query = self.supabase.table("ea_relationship_types").select("*").eq("id", rel["relationship_type_id"]).execute()
-                    rel_type = rel_type_query.data[0] if rel_type_query.data else {"name": "Unknown"}
-                    
-                    # Get the other element in the relationship
-                    other_id = rel["target_element_id"] if rel["source_element_id"] == related_id else rel["source_element_id"]
-                    other_element_query = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-                    
-                    if other_element_query.data:
-                        other_element = other_element_query.data[0]
-                        element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", other_element["type_id"]).execute()
-                        element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown"}
-                        
-                        # Check if this is already in our list
-                        if not any(e["id"] == other_element["id"] for e in related_elements):
-                            related_elements.append({
-                                "id": other_element["id"],
-                                "name": other_element["name"],
-                                "type": element_type["name"],
-                                "relationship": f"indirect via {rel_type['name']}",
-                                "direction": "secondary",
-                                "level": 2
-                            })
-        
-        # If depth is 3, we would continue to get more indirect relationships
-        # This could be implemented recursively or iteratively
-        # For now, we'll stop at depth 2
+                    seen_ids.add(other_id)
+                    frontier.append(other_id)
+                    related_elements.append({
+                        "id": other_id,
+                        "name": rel[f"{other}_name"],
+                        "type": rel[f"{other}_type"],
+                        "relationship": f"indirect via {rel['relationship_type']}",
+                        "direction": "secondary",
+                        "level": level
+                    })
         
         return related_elements
 
-    def _analyze_with_ai(self, element_data: Dict[str, Any], 
+    async def _analyze_with_ai(self, element_data: Dict[str, Any], 
                         related_elements: List[Dict[str, Any]],
                         change_description: str, change_type: str) -> Dict[str, Any]:
         """Generate impact analysis using OpenAI.
@@ -257,7 +223,7 @@ class ImpactAnalysis:
         """
         
         # Get completion from OpenAI
-        response = self.client.chat.completions.create(
+        response = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert enterprise architecture analyst specializing in impact analysis. Your job is to assess the potential impacts of architectural changes and provide actionable recommendations."},
@@ -265,7 +231,7 @@ class ImpactAnalysis:
             ],
             temperature=0.7,
             max_tokens=2500
-        )
+        ))
         
         # Extract the analysis
         analysis_text = response.choices[0].message.content
@@ -284,7 +250,7 @@ class ImpactAnalysis:
         """
         
         # Get structured response
-        structured_response = self.client.chat.completions.create(
+        structured_response = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert enterprise architecture analyst specializing in impact analysis. Your task is to structure impact analysis in JSON format."},
@@ -292,7 +258,7 @@ class ImpactAnalysis:
             ],
             temperature=0.3,
             max_tokens=2000
-        )
+        ))
         
         # Extract the JSON structure
         json_text = structured_response.choices[0].message.content
@@ -319,6 +285,15 @@ class ImpactAnalysis:
             "element_context": element_context
         }
 
+    def _current_user_id(self) -> str:
+        """Get the ID of the user analyses are logged for.
+        
+        The Supabase auth lookup is an HTTP call, so its result is kept.
+        """
+        if self._user_id is None:
+            self._user_id = self.supabase.auth.get_user().user.id
+        return self._user_id
+
     def _log_analysis(self, element_id: str, change_description: str, 
                      change_type: str, analysis_depth: int):
         """Log impact analysis in the database.
@@ -330,17 +305,18 @@ class ImpactAnalysis:
             analysis_depth: Depth of analysis
         """
         try:
-            # Insert a record into the ai_generated_content table
-            self.supabase.table("ai_generated_content").insert({
+            # Queue a record for the ai_generated_content table; a background
+            # thread inserts queued records in batches
+            get_activity_log_writer(self.supabase, "ai_generated_content").write({
                 "content_type": "analysis",
                 "related_element_id": element_id,
                 "prompt": f"Analyze impact of {change_type} change: {change_description}",
-                "created_by": self.supabase.auth.get_user().user.id,  # This would need to be passed in or retrieved
+                "created_by": self._current_user_id(),
                 "properties": {
                     "change_type": change_type,
                     "analysis_depth": analysis_depth
                 }
-            }).execute()
+            })
         except Exception as e:
             logger.error(f"Error logging impact analysis: {str(e)}")
             # Continue even if logging fails
@@ -5,31 +5,41 @@ This module implements the AI-powered pattern recognition capabilities
 for the Enterprise Architecture Solution using OpenAI's GPT models.
 """
 
-import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 import json
 from datetime import datetime
 
-from openai import OpenAI
+from . import queries
+from .activity_log import get_activity_log_writer
+from .clients import get_async_openai_client, with_openai_retry
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Logs recognitions off the request path (the user lookup is an HTTP call)
+_log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ea-pattern-log")
+
 class PatternRecognition:
     """Recognize architecture patterns and suggest improvements."""
     
-    def __init__(self, supabase_client):
+    __slots__ = ("supabase", "pg_pool", "_user_id")
+    
+    def __init__(self, supabase_client, pg_pool, user_id: Optional[str] = None):
         """Initialize the Pattern Recognition engine.
         
         Args:
-            supabase_client: A configured Supabase client for database operations
+            supabase_client: A configured Supabase client for database writes
+            pg_pool: Shared asyncpg pool for reading the EA repository
+            user_id: ID of the user recognitions are logged for; looked up from
+                the Supabase session on first use when not given
         """
         self.supabase = supabase_client
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.pg_pool = pg_pool
+        self._user_id = user_id
         
-    def recognize_patterns(self, model_id: str, element_ids: Optional[List[str]] = None,
+    async def recognize_patterns(self, model_id: str, element_ids: Optional[List[str]] = None,
                          domain_filter: Optional[str] = None, 
                          pattern_types: Optional[List[str]] = None) -> Dict[str, Any]:
         """Recognize patterns in architecture elements.
@@ -44,11 +54,11 @@ class PatternRecognition:
             Dict containing the recognized patterns
         """
         try:
-            # Get model data
-            model_data = self._get_model_data(model_id)
-            
-            # Get elements to analyze
-            elements = self._get_elements_to_analyze(model_id, element_ids, domain_filter)
+            # Model data and elements are independent lookups, so run them concurrently
+            model_data, elements = await asyncio.gather(
+                self._get_model_data(model_id),
+                self._get_elements_to_analyze(model_id, element_ids, domain_filter),
+            )
             
             if not elements:
                 return {
@@ -61,10 +71,12 @@ class PatternRecognition:
                 pattern_types = ["best_practice", "anti_pattern", "optimization", "security", "integration"]
                 
             # Perform pattern recognition using OpenAI
-            patterns = self._recognize_with_ai(model_data, elements, pattern_types)
+            patterns = await self._recognize_with_ai(model_data, elements, pattern_types)
             
-            # Log the pattern recognition
-            self._log_recognition(model_id, element_ids, domain_filter, pattern_types)
+            # Log the pattern recognition without waiting for it
+            _log_executor.submit(
+                self._log_recognition, model_id, element_ids, domain_filter, pattern_types
+            )
             
             return {
                 "success": True,
@@ -82,7 +94,7 @@ class PatternRecognition:
             logger.error(f"Error performing pattern recognition: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def _get_model_data(self, model_id: str) -> Dict[str, Any]:
+    async def _get_model_data(self, model_id: str) -> Dict[str, Any]:
         """Get model data from the database.
         
         Args:
@@ -91,30 +103,20 @@ class PatternRecognition:
         Returns:
             Model data dictionary
         """
-        # Query the model table
-        model_query = self.supabase.table("ea_models").select("*").eq("id", model_id).execute()
+        model = await self.pg_pool.fetchrow(queries.MODEL_DETAILS, model_id)
         
-        if not model_query.data:
+        if model is None:
             raise ValueError(f"Model with ID {model_id} not found")
-            
-        model = model_query.data[0]
-        
-        # Compile model data
-        model_data = {
-            "id": model["id"],
-            "name": model["name"],
-            "description": model["description"],
-            "status": model["status"],
-            "lifecycle_state": model["lifecycle_state"],
-            "properties": model["properties"]
-        }
         
-        return model_data
+        return dict(model)
 
-    def _get_elements_to_analyze(self, model_id: str, element_ids: Optional[List[str]] = None,
+    async def _get_elements_to_analyze(self, model_id: str, element_ids: Optional[List[str]] = None,
                                domain_filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get elements to analyze based on filters.
         
+        Elements and their relationships are selected by the same filters in
+        separate queries that run concurrently.
+        
         Args:
             model_id: ID of the model
             element_ids: Optional list of specific element IDs
@@ -123,97 +125,57 @@ class PatternRecognition:
         Returns:
             List of elements to analyze
         """
-        elements = []
-        
-        # Build the query
-        query = self.supabase.table("ea_elements").select("*").eq("model_id", model_id)
+        params = (model_id, element_ids or None, domain_filter or None)
+        element_items, relationship_rows = await asyncio.gather(
+            self.pg_pool.fetch(queries.MODEL_ELEMENTS, *params),
+            self.pg_pool.fetch(queries.MODEL_ELEMENT_RELATIONSHIPS, *params),
+        )
         
-        # Apply element ID filter if provided
-        if element_ids:
-            query = query.in_("id", element_ids)
-            
-        # Execute the query
-        elements_query = query.execute()
-        element_items = elements_query.data if elements_query.data else []
-        
-        # Process each element
-        for element in element_items:
-            # Get element type
-            element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", element["type_id"]).execute()
-            element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown", "domain_id": None}
-            
-            # Apply domain filter if provided
-            if domain_filter:
-                # Get domain for this element type
-                domain_query = self.supabase.table("ea_domains").select("*").eq("id", element_type["domain_id"]).execute()
-                domain = domain_query.data[0] if domain_query.data else {"name": "Unknown"}
-                
-                # Skip if domain doesn't match
-                if domain["name"].lower() != domain_filter.lower():
-                    continue
-            
-            # Get relationships for this element
-            relationships = self._get_element_relationships(element["id"])
-            
-            elements.append({
-                "id": element["id"],
-                "name": element["name"],
-                "description": element["description"],
-                "type": element_type["name"],
-                "status": element["status"],
-                "properties": element["properties"],
-                "relationships": relationships
-            })
+        relationships = self._group_relationships(
+            [element["id"] for element in element_items], relationship_rows
+        )
         
-        return elements
+        return [
+            {**dict(element), "relationships": relationships[element["id"]]}
+            for element in element_items
+        ]
 
-    def _get_element_relationships(self, element_id: str) -> List[Dict[str, Any]]:
-        """Get relationships for an element.
+    def _group_relationships(self, element_ids: List[str],
+                             rows: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Group relationship rows by the analyzed element they belong to.
         
         Args:
-            element_id: ID of the element
+            element_ids: IDs of the analyzed elements
+            rows: Relationship rows touching those elements
             
         Returns:
-            List of relationships
+            Dict mapping each element ID to its list of relationships
         """
-        relationships = []
-        
-        # Get relationships where this element is the source
-        source_rels_query = self.supabase.table("ea_relationships").select("*").eq("source_element_id", element_id).execute()
-        source_rels = source_rels_query.data if source_rels_query.data else []
-        
-        # Get relationships where this element is the target
-        target_rels_query = self.supabase.table("ea_relationships").select("*").eq("target_element_id", element_id).execute()
-        target_rels = target_rels_query.data if target_rels_query.data else []
-        
-        # Process relationships
-        for rel in source_rels + target_rels:
-            rel_type_query = self.supabase.table("ea_relationship_types").select("*").eq("id", rel["relationship_type_id"]).execute()
-            rel_type = rel_type_query.data[0] if rel_type_query.data else {"name": "Unknown"}
-            
-            # Get the other element in the relationship
-            other_id = rel["target_element_id"] if rel["source_element_id"] == element_id else rel["source_element_id"]
-            other_element_query = self.supabase.table("ea_elements").select("*").eq("id", other_id).execute()
-            
-            if other_element_query.data:
-                other_element = other_element_query.data[0]
-                element_type_query = self.supabase.table("ea_element_types").select("*").eq("id", other_element["type_id"]).execute()
-                element_type = element_type_query.data[0] if element_type_query.data else {"name": "Unknown"}
+        relationships = {element_id: [] for element_id in element_ids}
+        
+        # A relationship is listed under each of its endpoints that is being analyzed
+        for rel in rows:
+            for element_id, direction, other in (
+                (rel["source_element_id"], "outgoing", "target"),
+                (rel["target_element_id"], "incoming", "source"),
+            ):
+                if element_id not in relationships:
+                    continue
                 
-                relationships.append({
+                relationships[element_id].append({
                     "id": rel["id"],
-                    "type": rel_type["name"],
-                    "direction": "outgoing" if rel["source_element_id"] == element_id else "incoming",
+                    "type": rel["relationship_type"],
+                    "direction": direction,
                     "element": {
-                        "id": other_element["id"],
-                        "name": other_element["name"],
-                        "type": element_type["name"]
+                        "id": rel[f"{other}_element_id"],
+                        "name": rel[f"{other}_name"],
+                        "type": rel[f"{other}_type"]
                     }
                 })
         
         return relationships
 
-    def _recognize_with_ai(self, model_data: Dict[str, Any], 
+    async def _recognize_with_ai(self, model_data: Dict[str, Any], 
                           elements: List[Dict[str, Any]],
                           pattern_types: List[str]) -> Dict[str, Any]:
         """Recognize patterns using OpenAI.
@@ -267,7 +229,7 @@ class PatternRecognition:
         """
         
         # Get completion from OpenAI
-        response = self.client.chat.completions.create(
+        response = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert enterprise architect specializing in pattern recognition. Your job is to identify architectural patterns, evaluate them against best practices, and suggest improvements."},
@@ -275,7 +237,7 @@ class PatternRecognition:
             ],
             temperature=0.7,
             max_tokens=3000
-        )
+        ))
         
         # Extract the pattern analysis
         pattern_text = response.choices[0].message.content
@@ -302,7 +264,7 @@ class PatternRecognition:
         """
         
         # Get structured response
-        structured_response = self.client.chat.completions.create(
+        structured_response = await with_openai_retry(lambda: get_async_openai_client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert enterprise architect specializing in pattern recognition. Your task is to structure pattern analysis in JSON format."},
@@ -310,7 +272,7 @@ class PatternRecognition:
             ],
             temperature=0.3,
             max_tokens=2000
-        )
+        ))
         
         # Extract the JSON structure
         json_text = structured_response.choices[0].message.content
@@ -344,6 +306,15 @@ class PatternRecognition:
             "text_analysis": pattern_text
         }
 
+    def _current_user_id(self) -> str:
+        """Get the ID of the user recognitions are logged for.
+        
+        The Supabase auth lookup is an HTTP call, so its result is kept.
+        """
+        if self._user_id is None:
+            self._user_id = self.supabase.auth.get_user().user.id
+        return self._user_id
+
     def _log_recognition(self, model_id: str, element_ids: Optional[List[str]],
                         domain_filter: Optional[str], pattern_types: Optional[List[str]]):
         """Log pattern recognition in the database.
@@ -355,18 +326,19 @@ class PatternRecognition:
             pattern_types: Optional pattern types
         """
         try:
-            # Insert a record into the ai_generated_content table
-            self.supabase.table("ai_generated_content").insert({
+            # Queue a record for the ai_generated_content table; a background
+            # thread inserts queued records in batches
+            get_activity_log_writer(self.supabase, "ai_generated_content").write({
                 "content_type": "pattern",
                 "related_model_id": model_id,
                 "prompt": f"Recognize patterns in model {model_id}",
-                "created_by": self.supabase.auth.get_user().user.id,  # This would need to be passed in or retrieved
+                "created_by": self._current_user_id(),
                 "properties": {
                     "element_ids": element_ids,
                     "domain_filter": domain_filter,
                     "pattern_types": pattern_types
                 }
-            }).execute()
+            })
         except Exception as e:
             logger.error(f"Error logging pattern recognition: {str(e)}")
             # Continue even if logging fails
@@ -0,0 +1,18 @@
+"""
+Enterprise Architecture Solution - GenAI Prompts
+
+This module holds the shared system prompt prefix for the agent tools. OpenAI
+caches identical prompt prefixes of 1024 tokens or more, so the prefix is kept
+long, static and free of request data; task instructions follow it and request
+data goes last, in the user message.
+
+The prefix is the EA reference bundled next to this module (frameworks, element
+and relationship type catalogs, quality checklist), read once at import so every
+call carries the same framework knowledge at cached-token prices.
+"""
+
+from pathlib import Path
+
+EA_REFERENCE_PATH = Path(__file__).with_name("ea_reference.md")
+
+EA_SYSTEM_PREFIX = EA_REFERENCE_PATH.read_text(encoding="utf-8").rstrip()
@@ -0,0 +1,135 @@
+"""
+Enterprise Architecture Solution - GenAI SQL Queries
+
+This module holds the SQL used by the GenAI features when reading the EA repository
+directly from Postgres through the shared asyncpg pool.
+"""
+
+# Element with its type and model names
+ELEMENT_DETAILS = """
+    SELECT e.id::text AS id, e.name, e.description, e.status, e.properties,
+           COALESCE(t.name, 'Unknown') AS type,
+           COALESCE(m.name, 'Unknown') AS model
+    FROM ea_elements e
+    LEFT JOIN ea_element_types t ON t.id = e.type_id
+    LEFT JOIN ea_models m ON m.id = e.model_id
+    WHERE e.id = $1::uuid
+"""
+
+# Element with its type and model names and its relationships in both directions,
+# each resolved to the other element's name and type, assembled in one statement.
+# Each branch of the UNION ALL uses one endpoint index; self-relationships are
+# listed once, as outgoing. Relationships are ordered (outgoing first, then by
+# name) so the same data always yields the same prompt.
+ELEMENT_WITH_RELATIONSHIPS = """
+    SELECT e.id::text AS id, e.name, e.description, e.status, e.properties,
+           COALESCE(t.name, 'Unknown') AS type,
+           COALESCE(m.name, 'Unknown') AS model,
+           COALESCE((
+               SELECT jsonb_agg(jsonb_build_object(
+                   'relationship_type', COALESCE(rt.name, 'Unknown'),
+                   'element_name', o.name,
+                   'element_type', COALESCE(ot.name, 'Unknown'),
+                   'direction', rel.direction
+               ) ORDER BY rel.direction DESC, o.name)
+               FROM (
+                   SELECT r.relationship_type_id, r.target_element_id AS other_id, 'outgoing' AS direction
+                   FROM ea_relationships r
+                   WHERE r.source_element_id = e.id
+                   UNION ALL
+                   SELECT r.relationship_type_id, r.source_element_id, 'incoming'
+                   FROM ea_relationships r
+                   WHERE r.target_element_id = e.id AND r.source_element_id <> e.id
+               ) rel
+               LEFT JOIN ea_relationship_types rt ON rt.id = rel.relationship_type_id
+               JOIN ea_elements o ON o.id = rel.other_id
+               LEFT JOIN ea_element_types ot ON ot.id = o.type_id
+           ), '[]'::jsonb) AS relationships
+    FROM ea_elements e
+    LEFT JOIN ea_element_types t ON t.id = e.type_id
+    LEFT JOIN ea_models m ON m.id = e.model_id
+    WHERE e.id = $1::uuid
+"""
+
+# Elements with their type and model names, by ID
+ELEMENTS_BY_IDS = """
+    SELECT e.id::text AS id, e.name, e.description, e.status, e.properties,
+           COALESCE(t.name, 'Unknown') AS type,
+           COALESCE(m.name, 'Unknown') AS model
+    FROM ea_elements e
+    LEFT JOIN ea_element_types t ON t.id = e.type_id
+    LEFT JOIN ea_models m ON m.id = e.model_id
+    WHERE e.id = ANY($1::uuid[])
+"""
+
+# Model summary
+MODEL_DETAILS = """
+    SELECT id::text AS id, name, description, status, lifecycle_state, properties
+    FROM ea_models
+    WHERE id = $1::uuid
+"""
+
+# Elements of a model, optionally restricted to a set of IDs and a domain name
+MODEL_ELEMENTS = """
+    SELECT e.id::text AS id, e.name, e.description, e.status, e.properties,
+           COALESCE(t.name, 'Unknown') AS type
+    FROM ea_elements e
+    LEFT JOIN ea_element_types t ON t.id = e.type_id
+    LEFT JOIN ea_domains d ON d.id = t.domain_id
+    WHERE e.model_id = $1::uuid
+      AND ($2::uuid[] IS NULL OR e.id = ANY($2::uuid[]))
+      AND ($3::text IS NULL OR lower(d.name) = lower($3::text))
+"""
+
+# Relationships touching any of the given elements, with both endpoints resolved
+RELATIONSHIPS_FOR_ELEMENTS = """
+    SELECT r.id::text AS id,
+           r.source_element_id::text AS source_element_id,
+           r.target_element_id::text AS target_element_id,
+           COALESCE(rt.name, 'Unknown') AS relationship_type,
+           s.name AS source_name, COALESCE(st.name, 'Unknown') AS source_type,
+           t.name AS target_name, COALESCE(tt.name, 'Unknown') AS target_type
+    FROM ea_relationships r
+    LEFT JOIN ea_relationship_types rt ON rt.id = r.relationship_type_id
+    JOIN ea_elements s ON s.id = r.source_element_id
+    LEFT JOIN ea_element_types st ON st.id = s.type_id
+    JOIN ea_elements t ON t.id = r.target_element_id
+    LEFT JOIN ea_element_types tt ON tt.id = t.type_id
+    WHERE r.source_element_id = ANY($1::uuid[])
+       OR r.target_element_id = ANY($1::uuid[])
+"""
+
+# Relationships touching the elements selected by MODEL_ELEMENTS (same parameters),
+# so both can be fetched concurrently
+MODEL_ELEMENT_RELATIONSHIPS = """
+    WITH selected AS (
+        SELECT e.id
+        FROM ea_elements e
+        LEFT JOIN ea_element_types t ON t.id = e.type_id
+        LEFT JOIN ea_domains d ON d.id = t.domain_id
+        WHERE e.model_id = $1::uuid
+          AND ($2::uuid[] IS NULL OR e.id = ANY($2::uuid[]))
+          AND ($3::text IS NULL OR lower(d.name) = lower($3::text))
+    )
+    SELECT r.id::text AS id,
+           r.source_element_id::text AS source_element_id,
+           r.target_element_id::text AS target_element_id,
+           COALESCE(rt.name, 'Unknown') AS relationship_type,
+           s.name AS source_name, COALESCE(st.name, 'Unknown') AS source_type,
+           t.name AS target_name, COALESCE(tt.name, 'Unknown') AS target_type
+    FROM ea_relationships r
+    LEFT JOIN ea_relationship_types rt ON rt.id = r.relationship_type_id
+    JOIN ea_elements s ON s.id = r.source_element_id
+    LEFT JOIN ea_element_types st ON st.id = s.type_id
+    JOIN ea_elements t ON t.id = r.target_element_id
+    LEFT JOIN ea_element_types tt ON tt.id = t.type_id
+    WHERE r.source_element_id IN (SELECT id FROM selected)
+       OR r.target_element_id IN (SELECT id FROM selected)
+"""
+
+# Stored documentation for content, by prompt fingerprint
+STORED_DOCUMENTATION = """
+    SELECT documentation
+    FROM ai_documentation_cache
+    WHERE content_id = $1::uuid AND fingerprint = $2
+"""
@@ -0,0 +1,184 @@
+"""
+Enterprise Architecture Solution - GenAI Semantic Cache
+
+This module caches GenAI tool completions in the ea_llm_cache table. A lookup
+first tries the exact hash of the canonical prompt context and then falls back to
+the nearest cached context by embedding distance, so repeated or near-identical
+analyses are answered without another chat completion.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import orjson
+from anyio import to_thread
+
+from .clients import get_async_openai_client, with_openai_retry
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Keeps embedding inputs well inside the model's 8191-token limit
+_MAX_EMBEDDING_CHARS = 24000
+
+def canonical_json(context: Any) -> str:
+    """Serialize a prompt context with sorted keys.
+
+    Args:
+        context: JSON-serializable prompt context
+
+    Returns:
+        Canonical JSON text
+    """
+    return orjson.dumps(context, option=orjson.OPT_SORT_KEYS, default=str).decode()
+
+class SemanticCache:
+    """Exact and nearest-neighbour cache of completions in one namespace."""
+
+    def __init__(self, supabase_client, namespace: str, max_distance: float = 0.05,
+                 ttl: timedelta = timedelta(days=1), table: str = "ea_llm_cache"):
+        """Initialize the cache.
+
+        Args:
+            supabase_client: A configured Supabase client
+            namespace: Kind of completion cached, so unrelated prompts never match
+            max_distance: Largest cosine distance served as a near-duplicate
+            ttl: Age after which cached completions are ignored
+            table: Cache table name
+        """
+        self.supabase = supabase_client
+        self.namespace = namespace
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.table = table
+
+    def scoped(self, scope: str) -> "SemanticCache":
+        """Get a cache over a narrower namespace with the same settings.
+
+        Exact and nearest-neighbour lookups only match entries stored in the
+        same scope, so completions for one artifact never answer another.
+
+        Args:
+            scope: Identifies the artifact and options the completions belong to
+
+        Returns:
+            SemanticCache for the scoped namespace
+        """
+        return SemanticCache(self.supabase, f"{self.namespace}:{scope}",
+                             self.max_distance, self.ttl, self.table)
+
+    def _key(self, context_json: str) -> str:
+        """Hash a canonical context within this namespace."""
+        return hashlib.sha256(f"{self.namespace}:{context_json}".encode("utf-8")).hexdigest()
+
+    async def _embed(self, text: str) -> List[float]:
+        """Embed the text that identifies a context."""
+        response = await with_openai_retry(lambda: get_async_openai_client().embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=text[:_MAX_EMBEDDING_CHARS],
+        ))
+        return response.data[0].embedding
+
+    def _get_exact(self, key: str) -> Optional[str]:
+        """Look up a fresh completion by exact key."""
+        cutoff = (datetime.now(timezone.utc) - self.ttl).isoformat()
+        result = self.supabase.table(self.table).select("response").eq("key", key).gt(
+            "created_at", cutoff
+        ).limit(1).execute()
+        return result.data[0]["response"] if result.data else None
+
+    def _get_nearest(self, embedding: List[float]) -> Optional[str]:
+        """Look up the closest fresh completion within the distance threshold."""
+        result = self.supabase.rpc("match_llm_cache", {
+            "cache_namespace": self.namespace,
+            "query_embedding": embedding,
+            "max_distance": self.max_distance,
+            "max_age": f"{int(self.ttl.total_seconds())} seconds",
+        }).execute()
+        return result.data[0]["response"] if result.data else None
+
+    def _put(self, key: str, embedding: List[float], response: str):
+        """Store a completion, replacing any previous entry for the key."""
+        self.supabase.table(self.table).upsert({
+            "key": key,
+            "namespace": self.namespace,
+            "embedding": embedding,
+            "response": response,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+
+    async def get(self, context_json: str,
+                  embedding_text: Optional[str] = None) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Get a cached completion for a context.
+
+        Args:
+            context_json: Canonical JSON of the prompt context
+            embedding_text: Text embedded for the nearest-neighbour lookup,
+                defaults to the context JSON
+
+        Returns:
+            Tuple of the cached completion (or None) and the context embedding,
+            which is None when the exact key matched
+        """
+        cached = await to_thread.run_sync(self._get_exact, self._key(context_json))
+        if cached is not None:
+            return cached, None
+
+        embedding = await self._embed(embedding_text or context_json)
+        return await to_thread.run_sync(self._get_nearest, embedding), embedding
+
+    async def put(self, context_json: str, response: str,
+                  embedding: Optional[List[float]] = None, embedding_text: Optional[str] = None):
+        """Store a completion for a context.
+
+        Args:
+            context_json: Canonical JSON of the prompt context
+            response: Completion text
+            embedding: Context embedding, if already computed
+            embedding_text: Text embedded when no embedding is given,
+                defaults to the context JSON
+        """
+        if embedding is None:
+            embedding = await self._embed(embedding_text or context_json)
+        await to_thread.run_sync(self._put, self._key(context_json), embedding, response)
+
+    async def get_or_compute(self, context: Any, compute: Callable[[], Awaitable[str]],
+                             embedding_text: Optional[str] = None,
+                             accept: Optional[Callable[[str], bool]] = None) -> str:
+        """Get a cached completion for a context, computing and storing it on a miss.
+
+        Cache failures are logged and fall through to computing the completion.
+        Contexts that share a long static prompt should pass only their varying
+        part as embedding_text, or unrelated requests embed almost identically.
+
+        Args:
+            context: JSON-serializable prompt context
+            compute: Coroutine function producing the completion text
+            embedding_text: Text embedded for the nearest-neighbour lookup,
+                defaults to the canonical context JSON
+            accept: Optional check of a cached completion; rejected completions
+                are treated as a miss and replaced
+
+        Returns:
+            The cached or freshly computed completion text
+        """
+        context_json = canonical_json(context)
+        embedding = None
+        try:
+            cached, embedding = await self.get(context_json, embedding_text)
+            if cached is not None and (accept is None or accept(cached)):
+                return cached
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed for {self.namespace}: {str(e)}")
+
+        response = await compute()
+
+        try:
+            await self.put(context_json, response, embedding, embedding_text)
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed for {self.namespace}: {str(e)}")
+
+        return response
@@ -9,6 +9,8 @@ from typing import Dict, List, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
+from ..genai.cache import invalidate as invalidate_genai_cache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -155,6 +157,9 @@ async def create_element(element: ElementCreate):
 async def update_element(element_id: str, element: ElementUpdate):
     """Update an existing EA element."""
     try:
+        # Cached GenAI results derived from this element are now stale
+        invalidate_genai_cache(element_id)
+        
         # This would normally update in the database
         # For now, return a placeholder
         return {
@@ -191,6 +196,9 @@ async def update_element(element_id: str, element: ElementUpdate):
 async def delete_element(element_id: str):
     """Delete an EA element."""
     try:
+        # Cached GenAI results derived from this element are now stale
+        invalidate_genai_cache(element_id)
+        
         # This would normally delete from the database
         return None
     except Exception as e:
@@ -5,34 +5,41 @@ This module defines the FastAPI router for GenAI features.
 """
 
 import logging
-from typing import Dict, List, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Security, status
-from pydantic import BaseModel
+from typing import Dict, List, Any, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+import orjson
+import xxhash
 
 # Import the GenAI service
-from ..genai import GenAIService
+from ..genai import GenAIService, get_genai_service as get_shared_genai_service
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter()
 
+# Request values are validated once here; the GenAI service trusts them
+ContentType = Literal["element", "model", "view", "policy"]
+DocumentationFormat = Literal["markdown", "html", "docx"]
+DocumentationStyle = Literal["technical", "business", "executive"]
+
 # Pydantic models for request validation
 class DocumentationRequest(BaseModel):
-    content_type: str
+    content_type: ContentType
     content_id: str
-    format: str = "markdown"
+    format: DocumentationFormat = "markdown"
     include_diagrams: bool = True
-    include_relationships: bool = True
-    style: str = "technical"
+    include_relationships: Optional[bool] = None  # Default: all styles but executive
+    style: DocumentationStyle = "technical"
 
 class ImpactAnalysisRequest(BaseModel):
     element_id: str
     change_description: str
     change_type: str
-    analysis_depth: int = 2
+    analysis_depth: int = Field(2, ge=1, le=3)
 
 class PatternRecognitionRequest(BaseModel):
     model_id: str
@@ -48,23 +55,18 @@ class AssistantRequest(BaseModel):
     messages: List[AssistantMessage]
 
 # Dependency to get GenAI service
-def get_genai_service():
-    # This would normally be initialized with a Supabase client
-    # from a dependency injection system
-    from supabase import create_client
-    import os
-    
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
+def get_genai_service(request: Request) -> GenAIService:
+    # Reuse the database clients created at startup and the cached service built on them
+    supabase = getattr(request.app.state, "supabase", None)
+    pg_pool = getattr(request.app.state, "pg", None)
     
-    if not supabase_url or not supabase_key:
+    if supabase is None or pg_pool is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Supabase configuration is missing"
         )
     
-    supabase = create_client(supabase_url, supabase_key)
-    return GenAIService(supabase)
+    return get_shared_genai_service(supabase, pg_pool)
 
 # Route for documentation generation
 @router.post("/documentation", tags=["documentation"])
@@ -87,7 +89,7 @@ async def generate_documentation(
     - Generated documentation and metadata
     """
     try:
-        result = genai_service.generate_documentation(
+        result = await genai_service.generate_documentation(
             request.content_type,
             request.content_id,
             request.format,
@@ -101,8 +103,140 @@ async def generate_documentation(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=result.get("error", "Failed to generate documentation")
             )
-            
-        return result
+        
+        # Results are plain dicts built from trusted rows; skip jsonable_encoder
+        cache_status = result.pop("cache_status", "MISS")
+        return ORJSONResponse(result, headers={"X-Cache": cache_status})
+    except Exception as e:
+        logger.error(f"Error generating documentation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+# Media types for streamed documentation
+STREAM_MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
+# Route for streaming documentation generation
+@router.post("/documentation/stream", tags=["documentation"])
+async def stream_documentation(
+    request: DocumentationRequest,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
+    """
+    Stream documentation for an EA artifact as it is generated.
+    
+    Accepts the same parameters as POST /documentation; only markdown and html
+    formats can be streamed.
+    
+    Returns:
+    - The documentation text, streamed in chunks
+    """
+    try:
+        chunks = await genai_service.stream_documentation(
+            request.content_type,
+            request.content_id,
+            request.format,
+            request.include_diagrams,
+            request.include_relationships,
+            request.style
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error streaming documentation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+    # Starlette consumes the async OpenAI stream on the event loop
+    return StreamingResponse(chunks, media_type=STREAM_MEDIA_TYPES[request.format])
+
+# Browsers may reuse documentation briefly and revalidate in the background. The
+# route is authenticated, so shared caches must not store it
+DOCUMENTATION_CACHE_CONTROL = "private, max-age=60, stale-while-revalidate=300"
+DOCUMENTATION_VARY = "Authorization, X-API-Key"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag.
+    
+    The header may list several validators or be "*"; comparison is weak, so
+    W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    
+    def opaque(tag: str) -> str:
+        return tag.strip().removeprefix("W/")
+    
+    return any(
+        tag.strip() == "*" or opaque(tag) == opaque(etag)
+        for tag in if_none_match.split(",")
+    )
+
+# Cacheable route for documentation retrieval
+@router.get("/documentation/{content_type}/{content_id}", tags=["documentation"])
+async def get_documentation(
+    content_type: ContentType,
+    content_id: str,
+    http_request: Request,
+    format: DocumentationFormat = "markdown",
+    include_diagrams: bool = True,
+    include_relationships: Optional[bool] = None,
+    style: DocumentationStyle = "technical",
+    genai_service: GenAIService = Depends(get_genai_service)
+):
+    """
+    Get documentation for an EA artifact with HTTP caching support.
+    
+    Accepts the same options as POST /documentation as query parameters. Responses
+    carry an ETag; a matching If-None-Match header returns 304 Not Modified.
+    
+    Returns:
+    - Generated documentation and metadata
+    """
+    try:
+        result = await genai_service.generate_documentation(
+            content_type,
+            content_id,
+            format,
+            include_diagrams,
+            include_relationships,
+            style
+        )
+        
+        if not result["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result.get("error", "Failed to generate documentation")
+            )
+        
+        cache_status = result.pop("cache_status", "MISS")
+        body = orjson.dumps(result)
+        # Tag the documentation itself, not the body, whose generated_at changes on
+        # every regeneration and differs between workers
+        tagged = orjson.dumps([content_type, content_id, format, style, result["documentation"]])
+        etag = f'W/"{xxhash.xxh3_64_hexdigest(tagged)}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": DOCUMENTATION_CACHE_CONTROL,
+            "Vary": DOCUMENTATION_VARY,
+            "X-Cache": cache_status,
+        }
+        
+        if _etag_matches(http_request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        return Response(content=body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating documentation: {str(e)}")
         raise HTTPException(
@@ -129,7 +263,7 @@ async def analyze_impact(
     - Impact analysis results
     """
     try:
-        result = genai_service.analyze_impact(
+        result = await genai_service.analyze_impact(
             request.element_id,
             request.change_description,
             request.change_type,
@@ -141,8 +275,10 @@ async def analyze_impact(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=result.get("error", "Failed to analyze impact")
             )
-            
-        return result
+        
+        # Results are plain dicts built from trusted rows; skip jsonable_encoder
+        cache_status = result.pop("cache_status", "MISS")
+        return ORJSONResponse(result, headers={"X-Cache": cache_status})
     except Exception as e:
         logger.error(f"Error analyzing impact: {str(e)}")
         raise HTTPException(
@@ -169,7 +305,7 @@ async def recognize_patterns(
     - Recognized patterns
     """
     try:
-        result = genai_service.recognize_patterns(
+        result = await genai_service.recognize_patterns(
             request.model_id,
             request.element_ids,
             request.domain_filter,
@@ -181,8 +317,10 @@ async def recognize_patterns(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=result.get("error", "Failed to recognize patterns")
             )
-            
-        return result
+        
+        # Results are plain dicts built from trusted rows; skip jsonable_encoder
+        cache_status = result.pop("cache_status", "MISS")
+        return ORJSONResponse(result, headers={"X-Cache": cache_status})
     except Exception as e:
         logger.error(f"Error recognizing patterns: {str(e)}")
         raise HTTPException(
@@ -209,7 +347,7 @@ async def run_assistant(
         # Convert Pydantic models to dicts
         messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
         
-        result = genai_service.run_assistant(messages)
+        result = await genai_service.run_assistant(messages)
         
         if not result["success"]:
             raise HTTPException(
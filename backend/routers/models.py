@@ -9,6 +9,8 @@ from typing import Dict, List, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
+from ..genai.cache import invalidate as invalidate_genai_cache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -109,6 +111,9 @@ async def create_model(model: ModelCreate):
 async def update_model(model_id: str, model: ModelUpdate):
     """Update an existing EA model."""
     try:
+        # Cached GenAI results derived from this model are now stale
+        invalidate_genai_cache(model_id)
+        
         # This would normally update in the database
         # For now, return a placeholder
         return {
@@ -135,6 +140,9 @@ async def update_model(model_id: str, model: ModelUpdate):
 async def delete_model(model_id: str):
     """Delete an EA model."""
     try:
+        # Cached GenAI results derived from this model are now stale
+        invalidate_genai_cache(model_id)
+        
         # This would normally delete from the database
         return None
     except Exception as e:
@@ -0,0 +1,15 @@
+"""
+Shared test setup.
+
+The backend runs with backend/ as its working directory, so its modules are
+imported as top-level modules (e.g. ``from middleware import ...``). Routers
+import the genai package relatively and are imported as ``backend.routers``.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
@@ -0,0 +1,91 @@
+"""
+Tests for HTTP caching on the documentation retrieval route.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routers import genai as genai_router
+
+URL = "/api/genai/documentation/element/element-1"
+
+class FakeGenAIService:
+    """Returns the same documentation with a new timestamp on every call."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_documentation(self, content_type, content_id, format, include_diagrams,
+                                     include_relationships, style):
+        self.calls += 1
+        return {
+            "success": True,
+            "documentation": "# Element 1",
+            "metadata": {
+                "content_type": content_type,
+                "content_id": content_id,
+                "format": format,
+                "style": style,
+                "generated_at": f"2026-01-01T00:00:{self.calls:02d}",
+            },
+            "cache_status": "MISS",
+        }
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(genai_router.router, prefix="/api/genai")
+    service = FakeGenAIService()
+    app.dependency_overrides[genai_router.get_genai_service] = lambda: service
+    return TestClient(app)
+
+def test_documentation_is_privately_cacheable(client):
+    response = client.get(URL)
+    
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("private")
+    assert response.headers["vary"] == "Authorization, X-API-Key"
+    assert response.headers["etag"].startswith('W/"')
+
+def test_etag_ignores_generated_at(client):
+    first = client.get(URL)
+    second = client.get(URL)
+    
+    assert first.json()["metadata"]["generated_at"] != second.json()["metadata"]["generated_at"]
+    assert first.headers["etag"] == second.headers["etag"]
+
+def test_etag_depends_on_style(client):
+    technical = client.get(URL)
+    business = client.get(URL, params={"style": "business"})
+    
+    assert technical.headers["etag"] != business.headers["etag"]
+
+def test_matching_if_none_match_returns_304(client):
+    etag = client.get(URL).headers["etag"]
+    response = client.get(URL, headers={"If-None-Match": etag})
+    
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"].startswith("private")
+
+def test_stale_if_none_match_returns_the_documentation(client):
+    response = client.get(URL, headers={"If-None-Match": 'W/"stale"'})
+    
+    assert response.status_code == 200
+    assert response.json()["documentation"] == "# Element 1"
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ("", False),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('W/"xyz"', False),
+    ('"xyz", W/"abc"', True),
+    ('"xyz",  "abc" ', True),
+    ('"xyz", "uvw"', False),
+    ("*", True),
+])
+def test_etag_matches(if_none_match, expected):
+    assert genai_router._etag_matches(if_none_match, 'W/"abc"') is expected
@@ -0,0 +1,74 @@
+"""
+Tests for splitting impact analysis text into sections.
+"""
+
+import pytest
+
+from backend.genai.agents import ImpactAnalysisTool
+
+def _parse_line_by_line(analysis_text):
+    """The original line-by-line parser the regex split must agree with."""
+    sections = {}
+    current_section = "summary"
+    current_content = []
+    
+    for line in analysis_text.split('\n'):
+        line = line.strip()
+        if line.endswith(':') and len(line) < 50:
+            if current_content:
+                sections[current_section] = '\n'.join(current_content)
+                current_content = []
+            current_section = line[:-1].lower().replace(' ', '_')
+        else:
+            current_content.append(line)
+    
+    if current_content:
+        sections[current_section] = '\n'.join(current_content)
+    
+    return sections
+
+ANALYSIS = """Replacing the CRM will affect three connected elements.
+
+Direct Impacts:
+  - Sales Pipeline loses its customer source during cutover.
+  - Billing Service must be re-pointed to the new API.
+
+Indirect Impacts:
+    * Reporting dashboards built on CRM extracts break: they need remapping.
+
+Risk Assessment:
+High: the migration touches customer-facing processes.
+
+Mitigation Strategies:
+1. Run both systems in parallel for one billing cycle.
+2. Freeze schema changes until cutover.
+
+Implementation Considerations:
+Schedule the cutover outside quarter end.
+"""
+
+@pytest.mark.parametrize("analysis_text", [
+    ANALYSIS,
+    ANALYSIS.replace("\n", "\r\n"),
+    ANALYSIS.rstrip("\n"),
+    "Direct Impacts:\n- one\n\n\nRisk Assessment:\nLow",
+    "Summary:\nFirst.\nSummary:\nSecond.\n",
+    "Header One:\nHeader Two:\nbody\n",
+    "\n  \nLeading blank lines.\nRisks:\n\tTabbed body\t\n",
+    "Risk Assessment :\nspace before the colon",
+    "A line far too long to be taken for a section header, even though it ends:\nbody",
+    "Ends with a header:",
+    "Ends with a header:\n",
+    "No headers at all.\nJust prose.",
+    "",
+])
+def test_sections_match_line_by_line_parser(analysis_text):
+    parsed = ImpactAnalysisTool._parse_analysis_sections(None, analysis_text)
+    
+    assert parsed == _parse_line_by_line(analysis_text)
+    assert list(parsed) == list(_parse_line_by_line(analysis_text))
+
+def test_crlf_headers_start_sections():
+    parsed = ImpactAnalysisTool._parse_analysis_sections(None, "Intro\r\nRisk Assessment:\r\nHigh\r\n")
+    
+    assert parsed == {"summary": "Intro", "risk_assessment": "High\n"}
@@ -0,0 +1,89 @@
+"""
+Tests for the API key middleware.
+"""
+
+import pytest
+
+from middleware import APIKeyMiddleware
+
+API_KEY = b"test-api-key"
+
+def _scope(path="/api/models", method="GET", headers=()):
+    return {"type": "http", "method": method, "path": path, "headers": list(headers)}
+
+async def _call(scope):
+    """Run a request through the middleware and record what reached the app and the client."""
+    reached = []
+    sent = []
+    
+    async def app(scope, receive, send):
+        reached.append(scope)
+    
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    
+    async def send(message):
+        sent.append(message)
+    
+    await APIKeyMiddleware(app, expected=API_KEY)(scope, receive, send)
+    return reached, sent
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/health", "/ready", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"])
+async def test_exempt_paths_skip_the_key_check(path):
+    reached, sent = await _call(_scope(path))
+    
+    assert len(reached) == 1
+    assert sent == []
+
+@pytest.mark.asyncio
+async def test_cors_preflight_skips_the_key_check():
+    reached, sent = await _call(_scope(method="OPTIONS"))
+    
+    assert len(reached) == 1
+    assert sent == []
+
+@pytest.mark.asyncio
+async def test_non_http_scopes_pass_through():
+    reached, sent = await _call({"type": "lifespan"})
+    
+    assert len(reached) == 1
+    assert sent == []
+
+@pytest.mark.asyncio
+async def test_exempt_paths_match_exactly():
+    reached, sent = await _call(_scope("/healthz"))
+    
+    assert reached == []
+    assert sent[0]["status"] == 403
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers, detail", [
+    ((), b"API key is missing"),
+    (((b"x-api-key", b""),), b"API key is missing"),
+    (((b"x-api-key", b"wrong-key"),), b"Invalid API key"),
+])
+async def test_missing_or_invalid_key_is_rejected(headers, detail):
+    reached, sent = await _call(_scope(headers=headers))
+    
+    assert reached == []
+    start, body = sent
+    assert start["status"] == 403
+    assert (b"content-type", b"application/json") in start["headers"]
+    assert body["body"] == b'{"detail":"' + detail + b'"}'
+
+@pytest.mark.asyncio
+async def test_rejection_headers_are_a_fresh_list():
+    _, first = await _call(_scope())
+    first[0]["headers"].append((b"x-extra", b"1"))
+    _, second = await _call(_scope())
+    
+    assert (b"x-extra", b"1") not in second[0]["headers"]
+
+@pytest.mark.asyncio
+async def test_valid_key_passes_through():
+    scope = _scope(headers=((b"x-api-key", API_KEY),))
+    reached, sent = await _call(scope)
+    
+    assert reached == [scope]
+    assert sent == []
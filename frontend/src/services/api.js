@@ -2,12 +2,14 @@ import axios from 'axios';
 
 // Get API URL from environment or use default
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+const API_KEY = import.meta.env.VITE_API_KEY || '';
 
 // Create axios instance with base URL and default headers
 const apiClient = axios.create({
   baseURL: API_URL,
   headers: {
     'Content-Type': 'application/json',
+    'X-API-Key': API_KEY,
   },
 });
 
@@ -7,6 +7,7 @@
 import axios from 'axios';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+const API_KEY = import.meta.env.VITE_API_KEY || '';
 
 /**
  * Create an API client with proper headers
@@ -20,6 +21,7 @@ const createApiClient = () => {
     headers: {
       'Content-Type': 'application/json',
       'Authorization': token ? `Bearer ${token}` : '',
+      'X-API-Key': API_KEY,
     },
   });
 };